@@ -4,32 +4,170 @@ CLI client for SGR Vampi Code Agent.
 Real-time streaming display with live panel updates.
 """
 
-import json
 import os
-import sys
+import time
+from dataclasses import dataclass, field
 from typing import Any
 
+import httpx
+import jiter
+import orjson
 import typer
-from openai import OpenAI
 from rich.align import Align
-from rich.console import Console
+from rich.console import Console, Group
 from rich.live import Live
+from rich.markup import escape as escape_markup
 from rich.panel import Panel
 from rich.prompt import Prompt
-from rich.table import Table
 from rich.text import Text
 
 # Initialize
 app = typer.Typer()
 console = Console()
 
-# OpenAI client
-client = OpenAI(
-    api_key="dummy",
-    base_url="http://localhost:8010/v1"
+# Minimal interval between live panel re-renders and redraws (~20 fps)
+REFRESH_INTERVAL = 0.05
+REFRESH_PER_SECOND = 1 / REFRESH_INTERVAL
+# Minimal buffer growth (bytes) worth re-parsing and re-rendering a panel
+RENDER_MIN_GROWTH = 64
+
+# Key-value layout of the reasoning panel (plain padding instead of a Table)
+LABEL_WIDTH = 21
+LABEL_PAD = " " * LABEL_WIDTH
+
+# Title and border style of live panels per streamed tool
+PANEL_CHROME = {
+    "reasoningtool": ("[bold yellow]🤖 Agent Reasoning[/bold yellow]", "yellow"),
+    "finalanswertool": ("[bold cyan]💬 Answer[/bold cyan]", "cyan"),
+}
+
+# Argument fields shown in each live panel; unchanged values skip the re-render
+PANEL_FIELDS = {
+    "reasoningtool": (
+        "reasoning_steps", "current_situation", "plan_status", "enough_data", "remaining_steps", "task_completed"
+    ),
+    "finalanswertool": ("reasoning", "completed_steps", "answer"),
+}
+
+# Fail fast on an unreachable server; streamed responses may idle between chunks while tools run
+HTTP_TIMEOUT = httpx.Timeout(connect=10.0, read=600.0, write=30.0, pool=10.0)
+
+# HTTP client for the OpenAI-compatible agent server
+client = httpx.Client(
+    base_url="http://localhost:8010/v1",
+    headers={"Authorization": "Bearer dummy"},
+    timeout=HTTP_TIMEOUT,
 )
 
 
+class StreamError(RuntimeError):
+    """Error payload sent by the server in the middle of a completion stream."""
+
+
+def scan_json_depth(text: str, depth: int, in_string: bool, escape: bool) -> tuple[int, bool, bool]:
+    """Advance brace/bracket depth of a JSON stream by one delta.
+
+    Tracks string state so braces inside string values are not counted.
+    Returns the updated `(depth, in_string, escape)` triple.
+    """
+    for char in text:
+        if escape:
+            escape = False
+        elif in_string:
+            if char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+    return depth, in_string, escape
+
+
+class SerializedHistory:
+    """Chat messages kept together with their pre-encoded JSON array items.
+
+    Every message is serialized with orjson once, when it is appended, so a
+    new turn encodes only the new message instead of the whole history.
+    """
+
+    def __init__(self, messages: list[dict] | None = None):
+        self.messages: list[dict] = []
+        self._encoded = bytearray()
+        self._offsets: list[int] = []
+        for message in messages or []:
+            self.append(message)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def append(self, message: dict):
+        self._offsets.append(len(self._encoded))
+        if self.messages:
+            self._encoded += b","
+        self._encoded += orjson.dumps(message)
+        self.messages.append(message)
+
+    def pop(self) -> dict:
+        del self._encoded[self._offsets.pop():]
+        return self.messages.pop()
+
+    def request_body(self, **params: Any) -> bytes:
+        """Encode request params and splice in the pre-encoded messages."""
+        return b"".join((orjson.dumps(params)[:-1], b',"messages":[', self._encoded, b"]}"))
+
+
+def iter_sse_chunks(body: bytes):
+    """Yield raw chunk dicts from the streaming `/chat/completions` endpoint.
+
+    Frames are parsed straight from `data: ...` lines with orjson, skipping
+    the per-chunk pydantic models built by the openai SDK. An `{"error": ...}`
+    payload raises StreamError; payloads that are not JSON are reported and skipped.
+    """
+    headers = {"Content-Type": "application/json"}
+    with client.stream("POST", "/chat/completions", content=body, headers=headers) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data == "[DONE]":
+                break
+            try:
+                chunk = orjson.loads(data)
+            except orjson.JSONDecodeError:
+                console.print(f"[yellow]⚠ Skipped malformed stream payload:[/yellow] {escape_markup(data[:200])}")
+                continue
+            if isinstance(chunk, dict) and "error" in chunk:
+                error = chunk["error"]
+                raise StreamError(error.get("message", error) if isinstance(error, dict) else error)
+            yield chunk
+
+
+@dataclass(slots=True)
+class ToolState:
+    """Streaming state of a single tool call."""
+
+    name: str = ""
+    chunks: list[str] = field(default_factory=list)
+    length: int = 0
+    completed: bool = False
+    last_render_len: int = 0
+    panel: Panel | None = None
+    # Arguments parsed at `last_parsed_len`, reused until the buffer grows
+    last_parsed: dict | None = None
+    last_parsed_len: int = 0
+    # Snapshot of the PANEL_FIELDS values the panel was last rendered from
+    last_key: tuple | None = None
+    # JSON scanner state of the arguments stream
+    depth: int = 0
+    in_string: bool = False
+    escape: bool = False
+
+
 def print_banner():
     """Display centered startup banner."""
     banner = """
@@ -54,93 +192,91 @@ class RealtimeStreamHandler:
         self.debug_file = None
         
         # Buffers
-        self.tools = {}  # {tool_id: {name, buffer, live_display}}
-        self.content_buffer = ""
+        self.tools: dict[str, ToolState] = {}
+        self._content_parts: list[str] = []  # streamed non-JSON text, joined once at the end
         
-        # Live display references
-        self.current_live = None
+        # Live display shared by all streaming panels, redrawn by Rich's refresh thread
+        self.current_live: Live | None = None
+        self._renderables: dict[str, Panel] = {}  # {tool_id: panel} mounted in the live display
         self.reasoning_complete = False
 
+        # Throttled re-renders: last render time and tools with unrendered deltas
+        self._last_refresh = {}  # {tool_id: monotonic timestamp}
+        self._pending = set()
+
+        # Streamed text waiting to be printed in one call
+        self._content_pending = ""
+        self._last_content_flush = 0.0
+
     def _log(self, msg: str):
-        """Debug logging."""
-        if self.debug and self.debug_file:
+        """Debug logging (buffered, flushed when the debug file is closed)."""
+        if self.debug_file:
             self.debug_file.write(msg + "\n")
-            self.debug_file.flush()
 
-    def _create_reasoning_panel(self, json_buffer: str) -> Panel:
-        """Create reasoning panel from partial/complete JSON."""
-        # Try to parse what we have
-        data = {}
+    @staticmethod
+    def _buf(tool: ToolState) -> str:
+        """Materialize the accumulated argument chunks of a tool into one string."""
+        chunks = tool.chunks
+        if len(chunks) > 1:
+            chunks[:] = ["".join(chunks)]
+        return chunks[0] if chunks else ""
+
+    def _parse_json(self, json_buffer: str) -> dict:
+        """Parse partial/complete JSON, keeping whatever fields are already streamed."""
         try:
-            data = json.loads(json_buffer)
-        except json.JSONDecodeError:
-            # Partial JSON - try to extract what we can
-            # Show the raw buffer as "loading"
-            return Panel(
-                f"[dim]🤔 Reasoning in progress...\n\n{json_buffer[:200]}...[/dim]",
-                title="[bold yellow]🤖 Agent Reasoning[/bold yellow]",
-                border_style="yellow",
-                padding=(1, 2),
-            )
-        
-        # We have valid JSON - display it properly
-        table = Table(show_header=False, box=None, padding=(0, 1))
-        table.add_column("", style="bold yellow", width=20)
-        table.add_column("", style="white")
+            data = jiter.from_json(json_buffer.encode("utf-8"), partial_mode="trailing-strings")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _tool_data(self, tool: ToolState) -> dict:
+        """Parsed arguments of a tool, cached until new deltas arrive."""
+        if tool.last_parsed is None or tool.last_parsed_len != tool.length:
+            tool.last_parsed = self._parse_json(self._buf(tool))
+            tool.last_parsed_len = tool.length
+        return tool.last_parsed
+
+    def _reasoning_content(self, data: dict) -> str:
+        """Build reasoning panel content from partial/complete arguments."""
+        parts = []
 
         steps = data.get("reasoning_steps", [])
         if steps:
-            table.add_row("🧠 Reasoning:", "")
+            parts.append("[bold yellow]🧠 Reasoning:[/bold yellow]")
             for i, step in enumerate(steps, 1):
-                table.add_row("", f"  {i}. {step}")
-            table.add_row("", "")
+                parts.append(f"{LABEL_PAD}  {i}. {step}")
+            parts.append("")
 
         situation = data.get("current_situation", "")
         if situation:
-            table.add_row("📊 Situation:", situation)
-            table.add_row("", "")
+            parts.append(f"[bold yellow]{'📊 Situation:':<{LABEL_WIDTH}}[/bold yellow]{situation}")
+            parts.append("")
 
         plan = data.get("plan_status", "")
         if plan:
-            table.add_row("📋 Plan:", plan)
-            table.add_row("", "")
+            parts.append(f"[bold yellow]{'📋 Plan:':<{LABEL_WIDTH}}[/bold yellow]{plan}")
+            parts.append("")
 
         enough = data.get("enough_data")
         if enough is not None:
-            table.add_row("✅ Data Ready:", "Yes" if enough else "No")
-            table.add_row("", "")
+            parts.append(f"[bold yellow]{'✅ Data Ready:':<{LABEL_WIDTH}}[/bold yellow]{'Yes' if enough else 'No'}")
+            parts.append("")
 
         next_steps = data.get("remaining_steps", [])
         if next_steps:
-            table.add_row("➡️  Next Steps:", "")
+            parts.append("[bold yellow]➡️  Next Steps:[/bold yellow]")
             for i, step in enumerate(next_steps, 1):
-                table.add_row("", f"  {i}. {step}")
-            table.add_row("", "")
+                parts.append(f"{LABEL_PAD}  {i}. {step}")
+            parts.append("")
 
         done = data.get("task_completed")
         if done is not None:
-            table.add_row("🏁 Completed:", "✓ Yes" if done else "○ No")
+            parts.append(f"[bold yellow]{'🏁 Completed:':<{LABEL_WIDTH}}[/bold yellow]{'✓ Yes' if done else '○ No'}")
 
-        return Panel(
-            table,
-            title="[bold yellow]🤖 Agent Reasoning[/bold yellow]",
-            border_style="yellow",
-            padding=(1, 2),
-        )
+        return "\n".join(parts) if parts else "[dim]🤔 Reasoning in progress...[/dim]"
 
-    def _create_answer_panel(self, json_buffer: str) -> Panel:
-        """Create answer panel from partial/complete JSON."""
-        data = {}
-        try:
-            data = json.loads(json_buffer)
-        except json.JSONDecodeError:
-            return Panel(
-                f"[dim]💬 Answer loading...\n\n{json_buffer[:150]}...[/dim]",
-                title="[bold cyan]💬 Answer[/bold cyan]",
-                border_style="cyan",
-                padding=(1, 2),
-            )
-        
+    def _answer_content(self, data: dict) -> str:
+        """Build answer panel content from partial/complete arguments."""
         parts = []
         
         reasoning = data.get("reasoning", "")
@@ -159,157 +295,276 @@ class RealtimeStreamHandler:
         if answer:
             parts.append(answer)
         
-        return Panel(
-            "\n".join(parts) if parts else "[dim]Processing...[/dim]",
-            title="[bold cyan]💬 Answer[/bold cyan]",
-            border_style="cyan",
-            padding=(1, 2),
-        )
+        return "\n".join(parts) if parts else "[dim]Processing...[/dim]"
+
+    def _render_panel(self, tool: ToolState) -> Panel | None:
+        """Render current arguments of a tool into its panel.
+
+        The panel is created once per tool; later renders only swap its content,
+        and are skipped while the displayed fields are unchanged.
+        """
+        name = tool.name
+        if name not in PANEL_FIELDS:
+            return None
+
+        data = self._tool_data(tool)
+        key = tuple(tuple(v) if isinstance(v, list) else v for v in map(data.get, PANEL_FIELDS[name]))
+        if key == tool.last_key and tool.panel is not None:
+            return tool.panel
+        tool.last_key = key
+
+        if name == "reasoningtool":
+            content = self._reasoning_content(data)
+        else:
+            content = self._answer_content(data)
 
-    def _update_tool_display(self, tool_id: str, live: Live):
-        """Update the live display for a tool."""
+        panel = tool.panel
+        if panel is None:
+            title, border_style = PANEL_CHROME[name]
+            panel = tool.panel = Panel(content, title=title, border_style=border_style, padding=(1, 2))
+        else:
+            panel.renderable = content
+        return panel
+
+    def _start_live(self):
+        """Start the shared live display unless it is already running."""
+        if self.current_live is None:
+            self._flush_content()
+            self.current_live = Live(Group(), console=console, refresh_per_second=REFRESH_PER_SECOND)
+            self.current_live.start()
+
+    def _stop_live(self):
+        """Stop the shared live display if it is running."""
+        if self.current_live is not None:
+            self.current_live.stop()
+            self.current_live = None
+
+    def _mount_panels(self):
+        """Rebuild the live display group from the mounted panels."""
+        self.current_live.update(Group(*self._renderables.values()))
+
+    def _update_tool_display(self, tool_id: str, force: bool = False) -> bool:
+        """Update the live display for a tool.
+
+        Skips re-parse and re-render while the buffer grew by less than
+        RENDER_MIN_GROWTH bytes since the last render, unless forced.
+        The redraw itself is left to the live display's refresh thread.
+        Returns True if the display was updated.
+        """
         tool = self.tools[tool_id]
-        name = tool["name"]
-        buffer = tool["buffer"]
-        
+        mounted = tool_id in self._renderables
+
+        if not force and mounted and tool.length - tool.last_render_len < RENDER_MIN_GROWTH:
+            return False
+
+        panel = self._render_panel(tool)
+        if panel is None:
+            return False
+
+        tool.last_render_len = tool.length
+        if not mounted:
+            self._start_live()
+            self._renderables[tool_id] = panel
+            self._mount_panels()
+        return True
+
+    def _refresh_tool(self, tool_id: str, now: float, force: bool = False):
+        """Render buffered deltas of a tool into its live panel."""
+        if not self._update_tool_display(tool_id, force=force):
+            return
+        self._pending.discard(tool_id)
+        self._last_refresh[tool_id] = now
+
+    def _flush_pending(self):
+        """Render all tools that received deltas since their last render."""
+        now = time.monotonic()
+        for tool_id in list(self._pending):
+            self._refresh_tool(tool_id, now, force=True)
+        self._pending.clear()
+
+    def _flush_content(self):
+        """Print buffered content text."""
+        if self._content_pending:
+            console.print(self._content_pending, end="", style="white", markup=False, highlight=False, emoji=False)
+            self._content_pending = ""
+        self._last_content_flush = time.monotonic()
+
+    def _complete_tool(self, tool_id: str) -> list | None:
+        """Print the final panel for a tool whose arguments finished streaming.
+
+        Returns clarification questions if it is a clarification tool.
+        """
+        tool = self.tools[tool_id]
+        self._pending.discard(tool_id)
+        self._flush_content()
+        name = tool.name
+        if self.debug:
+            self._log(f"  ✓ JSON complete for {name}")
+        tool.completed = True
+
+        if name == "clarificationtool":
+            return self._tool_data(tool).get("questions", [])
+
+        panel = self._render_panel(tool)
+        if panel is None:
+            return None
         if name == "reasoningtool":
-            panel = self._create_reasoning_panel(buffer)
-            live.update(panel)
-        elif name == "finalanswertool":
-            panel = self._create_answer_panel(buffer)
-            live.update(panel)
+            self.reasoning_complete = True
+
+        # Final version: unmount from the live display and print it above the remaining panels
+        mounted = self._renderables.pop(tool_id, None) is not None
+        if mounted:
+            self._mount_panels()
+        console.print(panel, highlight=False)
+        console.print()
+        # Also stops a live display started for a tool that completed before it was ever mounted
+        if not self._renderables:
+            self._stop_live()
+        return None
 
-    def stream(self, model: str, messages: list) -> tuple[str, list | None, str | None]:
+    def _complete_tools(self) -> list | None:
+        """Complete all tools that are still streaming."""
+        clarifications = None
+        for tool_id, tool in self.tools.items():
+            if not tool.completed and tool.length:
+                clarifications = self._complete_tool(tool_id) or clarifications
+        return clarifications
+
+    def stream(self, model: str, history: SerializedHistory) -> tuple[str, list | None, str | None]:
         """Stream with real-time updates."""
         
         # Debug setup
         if self.debug:
             import datetime
             filename = f"debug_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            self.debug_file = open(filename, "w", encoding="utf-8")
+            self.debug_file = open(filename, "w", encoding="utf-8", buffering=1 << 16)
             console.print(f"[dim]📝 Debug: {filename}[/dim]\n")
         
         # Start streaming
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            stream=True,
-            temperature=0.3,
-        )
+        response = iter_sse_chunks(history.request_body(model=model, stream=True, temperature=0.3))
 
         agent_id = None
         chunk_num = 0
         clarifications = None
+
+        # Hot-loop locals
+        debug = self.debug
+        tools = self.tools
+        pending = self._pending
+        last_refresh = self._last_refresh
+        monotonic = time.monotonic
+        content_parts = self._content_parts
         
-        for chunk in response:
-            chunk_num += 1
-            self._log(f"\n{'='*60}\nCHUNK #{chunk_num}\n{'='*60}\n{chunk}")
-            
-            # Extract agent ID
-            if hasattr(chunk, "model") and chunk.model and "_" in chunk.model:
-                if not agent_id:
-                    agent_id = chunk.model
-            
-            # Get delta
-            if not hasattr(chunk, "choices") or not chunk.choices:
-                continue
-            
-            delta = chunk.choices[0].delta
-            if not delta:
-                continue
-            
-            # === HANDLE TOOL CALLS ===
-            if hasattr(delta, "tool_calls") and delta.tool_calls:
-                for tc in delta.tool_calls:
-                    if not tc.function:
-                        continue
-                    
-                    tool_id = tc.id if tc.id else f"idx_{tc.index}"
-                    
-                    # Initialize tool
-                    if tool_id not in self.tools:
-                        self.tools[tool_id] = {
-                            "name": "",
-                            "buffer": "",
-                            "live": None,
-                            "completed": False
-                        }
-                    
-                    tool = self.tools[tool_id]
-                    
-                    # Update name
-                    if tc.function.name:
-                        tool["name"] = tc.function.name
-                        self._log(f"Tool: {tool['name']}")
-                    
-                    # Accumulate arguments - THIS IS THE KEY PART
-                    if tc.function.arguments:
-                        tool["buffer"] += tc.function.arguments
-                        self._log(f"  Buffer now: {len(tool['buffer'])} chars")
+        try:
+            for chunk in response:
+                chunk_num += 1
+                if debug:
+                    self._log(f"\n{'='*60}\nCHUNK #{chunk_num}\n{'='*60}\n{chunk}")
+                
+                # Extract agent ID (once, from the first chunk that carries it)
+                if agent_id is None:
+                    chunk_model = chunk.get("model")
+                    if chunk_model and "_" in chunk_model:
+                        agent_id = chunk_model
+                
+                # Get delta
+                choices = chunk.get("choices")
+                if not choices:
+                    continue
+                
+                choice = choices[0]
+                delta = choice.get("delta") or {}
+                finish_reason = choice.get("finish_reason")
+
+                # === HANDLE TOOL CALLS ===
+                tool_calls = delta.get("tool_calls")
+                if tool_calls:
+                    for tc in tool_calls:
+                        func = tc.get("function")
+                        if not func:
+                            continue
                         
-                        # === REAL-TIME UPDATE ===
-                        name = tool["name"]
+                        tool_id = tc.get("id") or f"idx_{tc.get('index', 0)}"
                         
-                        # Start live display if needed
-                        if name in ["reasoningtool", "finalanswertool"]:
-                            if tool["live"] is None:
-                                # Create new Live display
-                                tool["live"] = Live(console=console, auto_refresh=False)
-                                tool["live"].start()
-                            
-                            # Update display with current buffer
-                            self._update_tool_display(tool_id, tool["live"])
-                            tool["live"].refresh()
+                        # Initialize tool
+                        tool = tools.get(tool_id)
+                        if tool is None:
+                            tool = tools[tool_id] = ToolState()
                         
-                        # Check if JSON is complete
-                        try:
-                            data = json.loads(tool["buffer"])
-                            if not tool["completed"]:
-                                self._log(f"  ✓ JSON complete for {name}")
-                                tool["completed"] = True
-                                
-                                # Stop live and print final version
-                                if tool["live"]:
-                                    tool["live"].stop()
-                                    tool["live"] = None
-                                
-                                # Print final clean version
-                                if name == "reasoningtool":
-                                    console.print(self._create_reasoning_panel(tool["buffer"]))
-                                    console.print()
-                                    self.reasoning_complete = True
-                                elif name == "finalanswertool":
-                                    console.print(self._create_answer_panel(tool["buffer"]))
-                                    console.print()
-                                elif name == "clarificationtool":
-                                    clarifications = data.get("questions", [])
+                        # Update name
+                        name = func.get("name")
+                        if name:
+                            tool.name = name
+                            if debug:
+                                self._log(f"Tool: {name}")
+                        else:
+                            name = tool.name
                         
-                        except json.JSONDecodeError:
-                            # Still accumulating
-                            pass
-            
-            # === HANDLE CONTENT ===
-            if hasattr(delta, "content") and delta.content:
-                text = delta.content
-                self.content_buffer += text
+                        # Accumulate arguments - THIS IS THE KEY PART
+                        arguments = func.get("arguments")
+                        if not arguments or tool.completed:
+                            continue
+
+                        tool.chunks.append(arguments)
+                        length = tool.length = tool.length + len(arguments)
+                        if debug:
+                            self._log(f"  Buffer now: {length} chars")
+
+                        # Arguments object is closed: finalize without waiting for finish_reason
+                        depth, in_string, escape = scan_json_depth(
+                            arguments, tool.depth, tool.in_string, tool.escape
+                        )
+                        tool.depth, tool.in_string, tool.escape = depth, in_string, escape
+                        if depth == 0 and self._buf(tool).lstrip().startswith("{"):
+                            clarifications = self._complete_tool(tool_id) or clarifications
+                            continue
+                        
+                        # === REAL-TIME UPDATE ===
+                        if name not in PANEL_CHROME:
+                            continue
+
+                        # Start live display if needed
+                        if tool_id not in last_refresh:
+                            self._start_live()
+                            # First render after REFRESH_INTERVAL, or straight away on completion
+                            last_refresh[tool_id] = monotonic()
+                        
+                        # Re-render at most once per REFRESH_INTERVAL
+                        pending.add(tool_id)
+                        now = monotonic()
+                        if now - last_refresh.get(tool_id, 0) > REFRESH_INTERVAL:
+                            self._refresh_tool(tool_id, now)
+                elif pending and not finish_reason:
+                    # Argument stream paused: render the throttled tail
+                    self._flush_pending()
                 
-                # Stream text directly (non-JSON)
-                if not text.strip().startswith("{") and not text.strip().startswith("}"):
-                    console.print(text, end="", style="white")
-                    sys.stdout.flush()
-        
-        # Cleanup any remaining live displays
-        for tool in self.tools.values():
-            if tool["live"]:
-                tool["live"].stop()
-        
-        # Debug close
-        if self.debug and self.debug_file:
-            self._log(f"\n{'='*60}\nEND - {chunk_num} chunks\n{'='*60}")
-            self.debug_file.close()
-            console.print(f"\n[dim]✅ Debug saved ({chunk_num} chunks)[/dim]\n")
+                # === HANDLE CONTENT ===
+                text = delta.get("content")
+                # Stream text (non-JSON), one print per line or REFRESH_INTERVAL
+                if text and text.lstrip()[:1] not in ("{", "}"):
+                    content_parts.append(text)
+                    self._content_pending += text
+                    if "\n" in text or monotonic() - self._last_content_flush > REFRESH_INTERVAL:
+                        self._flush_content()
+
+                # Tool arguments are complete once the model finishes its turn
+                if finish_reason:
+                    clarifications = self._complete_tools() or clarifications
+            
+            # Complete tools left open by a stream without finish_reason
+            clarifications = self._complete_tools() or clarifications
+            self._flush_content()
+        finally:
+            # Never leave an auto-refreshing live display behind, even if the stream raised
+            self._stop_live()
+
+            # Debug close
+            if self.debug and self.debug_file:
+                self._log(f"\n{'='*60}\nEND - {chunk_num} chunks\n{'='*60}")
+                self.debug_file.close()
+                console.print(f"\n[dim]✅ Debug saved ({chunk_num} chunks)[/dim]\n")
         
-        return self.content_buffer, clarifications, agent_id
+        return "".join(content_parts), clarifications, agent_id
 
 
 @app.command()
@@ -326,7 +581,7 @@ def chat(
     
     # State
     current_model = "sgr_tool_calling_agent"
-    history = []
+    history = SerializedHistory()
     
     while True:
         # Get input
@@ -413,7 +668,7 @@ def task(
         handler = RealtimeStreamHandler(debug=debug)
         content, clarifications, _ = handler.stream(
             "sgr_tool_calling_agent",
-            [{"role": "user", "content": prompt}]
+            SerializedHistory([{"role": "user", "content": prompt}])
         )
         
         if clarifications:
@@ -24,21 +24,33 @@ Key features:
 """
 
 import asyncio
-import json
+import functools
 import os
-import sys
+import queue
+import re
+import threading
 import time
-from typing import Any, Dict
+import traceback
+from typing import Any, Callable, Dict
 
+import orjson
 import typer
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.prompt import Prompt
+from rich.style import Style
 from rich.syntax import Syntax
 from rich.table import Table
 from rich.text import Text
 
+try:  # optional native JSON lexer: pip install "sgr-deep-research[fast]"
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
+
 from sgr_deep_research.core.agents.sgr_vampi_code_agent import SGRVampiCodeAgent
 from sgr_deep_research.core.models import AgentStatesEnum
 from sgr_deep_research.settings import get_config
@@ -48,54 +60,315 @@ app = typer.Typer()
 console = Console()
 config = get_config()
 
+# Characters that end a batch of streamed JSON and the max batch size
+FLUSH_CHARS = ',\n}]'
+FLUSH_SIZE = 64
 
-def print_banner():
-    """Display centered startup banner using Rich components."""
+# Pre-parsed styles of streamed JSON: structural characters, digits, then by context
+CHAR_STYLES = {
+    **dict.fromkeys("{}", Style.parse("bold cyan")),
+    **dict.fromkeys("[]", Style.parse("bold magenta")),
+    **dict.fromkeys('":,', Style.parse("dim white")),
+}
+DIGIT_STYLE = Style.parse("yellow")
+CONTEXT_STYLES = {
+    "key": Style.parse("bold green"),
+    "string": Style.parse("white"),
+    "other": Style.parse("white"),
+}
+
+# Raw ANSI sequences of the JSON styles, written directly to the terminal in fast mode
+ANSI_RESET = b"\x1b[0m"
+ANSI_STYLES = {
+    CHAR_STYLES["{"]: b"\x1b[1;36m",
+    CHAR_STYLES["["]: b"\x1b[1;35m",
+    CHAR_STYLES[":"]: b"\x1b[2;37m",
+    DIGIT_STYLE: b"\x1b[33m",
+    CONTEXT_STYLES["key"]: b"\x1b[1;32m",
+    CONTEXT_STYLES["string"]: b"\x1b[37m",
+    CONTEXT_STYLES["other"]: b"\x1b[37m",
+}
+
+# Frame rate of the live view of a streaming tool call
+LIVE_REFRESH_PER_SECOND = 30
+
+# Tools whose parsed arguments are pretty printed again after streaming
+PRETTY_PRINT_TOOLS = frozenset({"finalanswertool"})
+
+# Chat commands: every alias maps to its command name
+CMD_EXIT = frozenset({"/exit", "/quit", "/q"})
+CMD_CLEAR = frozenset({"/clear", "/cls"})
+CMD_HELP = frozenset({"/help", "/h"})
+COMMANDS = {
+    **dict.fromkeys(CMD_EXIT, "exit"),
+    **dict.fromkeys(CMD_CLEAR, "clear"),
+    **dict.fromkeys(CMD_HELP, "help"),
+}
+
+# Max interval between flushes of the debug log, and its write buffer size
+DEBUG_FLUSH_INTERVAL = 0.1
+DEBUG_BUFFER_SIZE = 1 << 16
+
+# SSE framing of the agent's streaming generator: "data: {json}\n\n"
+SSE_PREFIX = "data: "
+SSE_DONE = "[DONE]"
+
+# JSON lexer states and the patterns that consume a whole token piece at once
+LEX_DEFAULT, LEX_STRING, LEX_NUMBER = range(3)
+STRING_SPECIAL = re.compile(r'["\\]')
+NUMBER_RUN = re.compile(r"[0-9eE.+\-]*")
+OTHER_RUN = re.compile(r'[^"{}\[\],:0-9\-]+')
+
+# Deltas at least this long are lexed natively (if numba is installed); shorter ones aren't worth the call
+NATIVE_MIN_CHUNK = 256
+# Styles by style id of the native lexer
+NATIVE_STYLES = (
+    CHAR_STYLES[":"],
+    CHAR_STYLES["{"],
+    CHAR_STYLES["["],
+    DIGIT_STYLE,
+    CONTEXT_STYLES["key"],
+    CONTEXT_STYLES["string"],
+    CONTEXT_STYLES["other"],
+)
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def lex_json_native(buf, state, spans):
+        """Native counterpart of `JSONLexer.feed` over UTF-8 bytes.
+
+        `state` holds `(lex state, depth, escape next, after colon, string is value)`
+        and is updated in place. Writes `(start, length, style id)` runs of
+        equally styled bytes into `spans` and returns their count.
+        """
+        lex_state, depth, escape, after_colon, is_value = state[0], state[1], state[2], state[3], state[4]
+        count = 0
+        last = -1
+        for i in range(buf.shape[0]):
+            c = buf[i]
+            if lex_state == 1:  # LEX_STRING
+                sid = 5 if is_value else 4
+                if escape:
+                    escape = 0
+                elif c == 92:  # backslash
+                    escape = 1
+                elif c == 34:  # closing quote
+                    lex_state = 0
+                    sid = 0
+            elif lex_state == 2 and (48 <= c <= 57 or c == 101 or c == 69 or c == 46 or c == 43 or c == 45):
+                sid = 3  # LEX_NUMBER continues
+            else:
+                lex_state = 0
+                if c == 34:  # opening quote
+                    lex_state = 1
+                    is_value = after_colon
+                    sid = 0
+                elif c == 123 or c == 91:  # { [
+                    depth += 1
+                    after_colon = 0
+                    sid = 1 if c == 123 else 2
+                elif c == 125 or c == 93:  # } ]
+                    depth -= 1
+                    after_colon = 0
+                    sid = 1 if c == 125 else 2
+                elif c == 44 or c == 58:  # , :
+                    after_colon = 1 if c == 58 else 0
+                    sid = 0
+                elif c == 45 or 48 <= c <= 57:  # number start
+                    lex_state = 2
+                    sid = 3
+                else:
+                    if c == 10:
+                        after_colon = 0
+                    sid = 6
+            if sid == last:
+                spans[count - 1, 1] += 1
+            else:
+                spans[count, 0] = i
+                spans[count, 1] = 1
+                spans[count, 2] = sid
+                count += 1
+                last = sid
+        state[0], state[1], state[2], state[3], state[4] = lex_state, depth, escape, after_colon, is_value
+        return count
+
+else:
+    lex_json_native = None
+
+
+class JSONLexer:
+    """Incremental JSON tokenizer producing styled spans.
+
+    `feed` takes raw argument deltas and returns `(text, style)` spans
+    for them, one per token (or token piece, when a token is split
+    across deltas). Keys and values are told apart by the preceding
+    colon; brace/bracket depth outside strings is kept in `depth`.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Reset the lexer state between tool calls."""
+        self.state = LEX_DEFAULT
+        self.depth = 0
+        self._escape_next = False
+        self._after_colon = False
+        self._string_style = CONTEXT_STYLES["key"]
+
+    def feed(self, chunk: str) -> list[tuple[str, Style]]:
+        """Tokenize the next delta into styled spans."""
+        if lex_json_native is not None and len(chunk) >= NATIVE_MIN_CHUNK:
+            return self._feed_native(chunk)
+
+        spans = []
+        append = spans.append
+        i, n = 0, len(chunk)
+        while i < n:
+            if self.state == LEX_STRING:
+                # Consume up to the closing quote, skipping escaped characters
+                j = i
+                if self._escape_next:
+                    self._escape_next = False
+                    j += 1
+                end = n
+                closed = False
+                while j < n:
+                    match = STRING_SPECIAL.search(chunk, j)
+                    if match is None:
+                        break
+                    pos = match.start()
+                    if chunk[pos] == '"':
+                        end, closed = pos, True
+                        break
+                    if pos + 1 == n:
+                        self._escape_next = True
+                        break
+                    j = pos + 2
+                if end > i:
+                    append((chunk[i:end], self._string_style))
+                if not closed:
+                    break
+                append(('"', CHAR_STYLES['"']))
+                self.state = LEX_DEFAULT
+                i = end + 1
+                continue
+
+            if self.state == LEX_NUMBER:
+                end = NUMBER_RUN.match(chunk, i).end()
+                if end > i:
+                    append((chunk[i:end], DIGIT_STYLE))
+                if end == n:
+                    break
+                self.state = LEX_DEFAULT
+                i = end
+
+            char = chunk[i]
+            if char == '"':
+                # Opening quote: a string after a colon is a value, otherwise a key
+                self.state = LEX_STRING
+                self._string_style = CONTEXT_STYLES["string" if self._after_colon else "key"]
+                append((char, CHAR_STYLES[char]))
+                i += 1
+            elif char in "{}[],:":
+                if char in "{[":
+                    self.depth += 1
+                elif char in "}]":
+                    self.depth -= 1
+                self._after_colon = char == ":"
+                append((char, CHAR_STYLES[char]))
+                i += 1
+            elif char in "-0123456789":
+                self.state = LEX_NUMBER
+            else:
+                # Whitespace and literals (true/false/null)
+                end = OTHER_RUN.match(chunk, i).end()
+                text = chunk[i:end]
+                if "\n" in text:
+                    self._after_colon = False
+                append((text, CONTEXT_STYLES["other"]))
+                i = end
+        return spans
+
+    def _feed_native(self, chunk: str) -> list[tuple[str, Style]]:
+        """Tokenize a delta with the numba lexer, carrying state over from and back to Python."""
+        data = chunk.encode("utf-8")
+        buf = np.frombuffer(data, dtype=np.uint8)
+        state = np.array(
+            [
+                self.state,
+                self.depth,
+                self._escape_next,
+                self._after_colon,
+                self._string_style is CONTEXT_STYLES["string"],
+            ],
+            dtype=np.int32,
+        )
+        spans = np.empty((len(buf), 3), dtype=np.int32)
+        count = lex_json_native(buf, state, spans)
+
+        self.state, self.depth = int(state[0]), int(state[1])
+        self._escape_next, self._after_colon = bool(state[2]), bool(state[3])
+        self._string_style = CONTEXT_STYLES["string" if state[4] else "key"]
+        # Runs start and end on ASCII bytes, so slices never split a UTF-8 sequence
+        return [
+            (data[start : start + length].decode("utf-8"), NATIVE_STYLES[sid])
+            for start, length, sid in spans[:count].tolist()
+        ]
+
+
+def format_traceback(exc: BaseException) -> str:
+    """Format the traceback bound to a caught exception (empty if it has none)."""
+    if exc.__traceback__ is None:
+        return ""
+    return "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+
+
+# Static parts of the startup banner, built once at import
+# ASCII кот-вампир
+BANNER_CAT = Text("    ╱|、\n  (˚ˎ 。7\n   |、˜〵\n  じしˍ,)ノ", style="bold magenta")
+BANNER_TITLE = Text("🦇 SGR VAMPI CODE 🦇", style="bold white", justify="center")
+BANNER_SUBTITLE = Text("AI Coding Assistant with Streaming JSON", style="bold yellow")
+
+# Возможности
+BANNER_FEATURES = Table.grid(padding=(0, 1))
+BANNER_FEATURES.add_column(style="green bold", width=3)
+BANNER_FEATURES.add_column(style="white")
+BANNER_FEATURES.add_row("", Text("Возможности:", style="bold cyan"))
+BANNER_FEATURES.add_row("✓", "Чтение и анализ кода в репозитории")
+BANNER_FEATURES.add_row("✓", "Создание и редактирование файлов")
+BANNER_FEATURES.add_row("✓", "Поиск по коду (grep, семантический поиск)")
+BANNER_FEATURES.add_row("✓", "Рефакторинг и улучшение кода")
+BANNER_FEATURES.add_row("✓", "Непрерывный диалог с сохранением контекста")
+BANNER_FEATURES.add_row("✓", "Потоковый вывод с красивой подсветкой JSON")
+
+# Команды
+BANNER_COMMANDS = Table.grid(padding=(0, 1))
+BANNER_COMMANDS.add_column(style="bold", width=15)
+BANNER_COMMANDS.add_column(style="dim white")
+BANNER_COMMANDS.add_row(Text("Команды:", style="bold yellow"), "")
+BANNER_COMMANDS.add_row(Text("/exit, /quit", style="bold red"), "- Выйти из чата")
+BANNER_COMMANDS.add_row(Text("/clear", style="bold green"), "- Очистить экран")
+BANNER_COMMANDS.add_row(Text("/help", style="bold blue"), "- Показать справку")
+
+
+@functools.lru_cache(maxsize=1)
+def render_banner(width: int) -> str:
+    """Assemble the startup banner around its static parts and render it to a string for the given width."""
     
     # Создаём таблицу для содержимого
     table = Table.grid(padding=(0, 2))
     table.add_column(justify="center", style="bold white")
     
-    # ASCII кот-вампир
-    vampire_cat = Text()
-    vampire_cat.append("    ╱|、\n", style="bold magenta")
-    vampire_cat.append("  (˚ˎ 。7\n", style="bold magenta")
-    vampire_cat.append("   |、˜〵\n", style="bold magenta")
-    vampire_cat.append("  じしˍ,)ノ", style="bold magenta")
-    
-    table.add_row(vampire_cat)
+    table.add_row(BANNER_CAT)
     table.add_row("")
-    table.add_row(Text("🦇 SGR VAMPI CODE 🦇", style="bold white", justify="center"))
-    table.add_row(Text("AI Coding Assistant with Streaming JSON", style="bold yellow"))
+    table.add_row(BANNER_TITLE)
+    table.add_row(BANNER_SUBTITLE)
     table.add_row("")
-    
-    # Возможности
-    features = Table.grid(padding=(0, 1))
-    features.add_column(style="green bold", width=3)
-    features.add_column(style="white")
-    
-    features.add_row("", Text("Возможности:", style="bold cyan"))
-    features.add_row("✓", "Чтение и анализ кода в репозитории")
-    features.add_row("✓", "Создание и редактирование файлов")
-    features.add_row("✓", "Поиск по коду (grep, семантический поиск)")
-    features.add_row("✓", "Рефакторинг и улучшение кода")
-    features.add_row("✓", "Непрерывный диалог с сохранением контекста")
-    features.add_row("✓", "Потоковый вывод с красивой подсветкой JSON")
-    
-    table.add_row(features)
+    table.add_row(BANNER_FEATURES)
     table.add_row("")
-    
-    # Команды
-    commands = Table.grid(padding=(0, 1))
-    commands.add_column(style="bold", width=15)
-    commands.add_column(style="dim white")
-    
-    commands.add_row(Text("Команды:", style="bold yellow"), "")
-    commands.add_row(Text("/exit, /quit", style="bold red"), "- Выйти из чата")
-    commands.add_row(Text("/clear", style="bold green"), "- Очистить экран")
-    commands.add_row(Text("/help", style="bold blue"), "- Показать справку")
-    
-    table.add_row(commands)
+    table.add_row(BANNER_COMMANDS)
     table.add_row("")
     
     # Model info
@@ -114,17 +387,137 @@ def print_banner():
         expand=False
     )
     
-    console.print(panel, justify="center")
+    with console.capture() as capture:
+        console.print(panel, justify="center")
+    return capture.get()
+
+
+def print_banner():
+    """Display centered startup banner (rendered once per terminal width)."""
+    console.file.write(render_banner(console.width))
+    console.file.flush()
+
+
+def console_fileno() -> int | None:
+    """File descriptor of the console output, or None if it has no usable one (e.g. a captured stream)."""
+    try:
+        return console.file.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class RenderQueue:
+    """Console output rendered in order by a background task.
+
+    Producers enqueue print calls without blocking; the renderer task
+    prints them and applies typing delays with `asyncio.sleep`, so the
+    event loop keeps draining the agent stream meanwhile. In `immediate`
+    mode (no typing effect) output is written right away instead.
+    """
+
+    def __init__(self, immediate: bool = False):
+        self.immediate = immediate
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        # Live view mounted by the current tool printer; Rich allows only one active Live
+        self.live: Live | None = None
+
+    def start(self):
+        """Start the renderer task (requires a running event loop)."""
+        if not self.immediate:
+            self._task = asyncio.create_task(self._render())
+
+    def call(self, func: Callable, *args: Any, delay: float = 0.0, **kwargs: Any):
+        """Enqueue an output call, followed by an optional typing delay."""
+        if self.immediate:
+            self._run(func, args, kwargs)
+        else:
+            self._queue.put_nowait((func, args, kwargs, delay))
+
+    def print(self, *objects: Any, delay: float = 0.0, **kwargs: Any):
+        """Enqueue a `console.print` call, followed by an optional typing delay."""
+        self.call(console.print, *objects, delay=delay, **kwargs)
+
+    def start_live(self, renderable: Any) -> Live:
+        """Mount a live view that Rich redraws at LIVE_REFRESH_PER_SECOND, stopping any still mounted.
+
+        Overflow is cropped while streaming; Rich prints the full content once the view is stopped.
+        """
+        self.stop_live()
+        self.live = Live(
+            renderable,
+            console=console,
+            refresh_per_second=LIVE_REFRESH_PER_SECOND,
+            vertical_overflow="ellipsis",
+        )
+        self.live.start()
+        return self.live
+
+    def stop_live(self):
+        if self.live:
+            self.live.stop()
+            self.live = None
+
+    def write(self, data: bytes):
+        """Write raw (ANSI) bytes to the terminal, bypassing Rich."""
+        self.call(self._write, data)
+
+    @staticmethod
+    def _write(data: bytes):
+        fd = console_fileno()
+        if fd is None:
+            console.file.write(data.decode("utf-8"))
+            console.file.flush()
+            return
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+
+    async def close(self):
+        """Wait until everything enqueued so far is rendered, then stop the renderer."""
+        self._queue.put_nowait(None)
+        if self._task:
+            await self._task
+            self._task = None
+
+    @staticmethod
+    def _run(func: Callable, args: tuple, kwargs: dict):
+        """Run one output call; a failing call is reported instead of stopping the output."""
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            console.print(f"\nRender error: {type(e).__name__}: {e}", style="red", markup=False, highlight=False)
+
+    async def _render(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                break
+            func, args, kwargs, delay = item
+            self._run(func, args, kwargs)
+            if delay > 0:
+                await asyncio.sleep(delay)
 
 
 class JSONStreamPrinter:
     """Beautiful JSON streaming printer with typing effect."""
 
-    def __init__(self, typing_speed: float = 0.001):
+    def __init__(self, output: RenderQueue, typing_speed: float = 0.001, fast_mode: bool = False):
+        self.output = output
         self.typing_speed = typing_speed
-        self.json_buffer = ""
+        self.fast_mode = fast_mode  # write precomputed ANSI bytes instead of Rich renderables
         self.tool_name = ""
+        self.color = self._get_color_for_tool("")
         self.current_indent = 0
+        self.lexer = JSONLexer()
+
+        # Styled characters waiting to be printed in one call, and their typing delay
+        self._pending = Text()
+        self._pending_sleep = 0.0
+
+        # Live view of the current tool call, grown in place by the renderer
+        self._live: Live | None = None
+        self._live_text = Text()
 
     def _get_color_for_tool(self, tool_name: str) -> str:
         """Get color based on tool name."""
@@ -138,94 +531,93 @@ class JSONStreamPrinter:
         }
         return color_map.get(tool_name.lower(), color_map["default"])
 
-    def _colorize_json_char(self, char: str, context: str) -> Text:
-        """Colorize individual JSON character based on context."""
-        text = Text()
-        
-        # Determine color based on character and context
-        if char in '{}':
-            text.append(char, style="bold cyan")
-        elif char in '[]':
-            text.append(char, style="bold magenta")
-        elif char in '":,':
-            text.append(char, style="dim white")
-        elif char.isdigit():
-            text.append(char, style="yellow")
-        elif context == "key":
-            text.append(char, style="bold green")
-        elif context == "string":
-            text.append(char, style="white")
+    def _flush(self):
+        """Enqueue pending characters as one append, with the whole batch's typing delay."""
+        if self._pending:
+            self.output.call(self._append_live, self._pending, delay=self._pending_sleep)
+            self._pending = Text()
+            self._pending_sleep = 0.0
+
+    def _start_live(self):
+        """Mount this tool call's live view on the shared output, replacing any earlier one."""
+        self._live_text = Text()
+        self._live = self.output.start_live(self._live_text)
+
+    def _append_live(self, text: Text):
+        """Grow the live view in place (printed directly if no view is mounted)."""
+        if self._live is not None and self._live is self.output.live:
+            self._live_text.append_text(text)
         else:
-            text.append(char, style="white")
-        
-        return text
+            console.print(text, end="")
 
-    def _detect_context(self, buffer: str, pos: int) -> str:
-        """Detect if we're in a key, value, string, etc."""
-        # Simple heuristic: count quotes before this position
-        before = buffer[:pos]
-        quote_count = before.count('"') - before.count('\\"')
-        
-        if quote_count % 2 == 1:  # Inside quotes
-            # Check if it's after a colon (value) or not (key)
-            last_colon = before.rfind(':')
-            last_quote = before.rfind('"')
-            if last_colon > last_quote:
-                return "string"
-            else:
-                return "key"
-        return "other"
+    def _stop_live(self):
+        """Unmount the live view, unless another printer has already replaced it."""
+        if self._live is not None and self._live is self.output.live:
+            self.output.stop_live()
+        self._live = None
+
+    def close(self):
+        """Unmount the live view of an unfinished tool call."""
+        self._stop_live()
 
     def print_tool_header(self, tool_name: str):
         """Print tool name header."""
         self.tool_name = tool_name
-        color = self._get_color_for_tool(tool_name)
+        self.color = color = self._get_color_for_tool(tool_name)
         
-        console.print()
-        console.print(f"[bold {color}]╭─── {tool_name.upper()} ───╮[/bold {color}]")
-        console.print()
-
-    def stream_char(self, char: str):
-        """Stream a single character with typing effect."""
-        self.json_buffer += char
-        pos = len(self.json_buffer) - 1
-        context = self._detect_context(self.json_buffer, pos)
-        
-        colored_char = self._colorize_json_char(char, context)
-        console.print(colored_char, end="")
-        
-        # Flush to make it appear immediately
-        sys.stdout.flush()
-        
-        # Typing effect delay
-        if self.typing_speed > 0:
-            time.sleep(self.typing_speed)
+        self.output.print()
+        self.output.print(f"[bold {color}]╭─── {tool_name.upper()} ───╮[/bold {color}]")
+        self.output.print()
+        if not self.fast_mode:
+            self.output.call(self._start_live)
 
     def stream_chunk(self, chunk: str):
-        """Stream a chunk of JSON."""
-        for char in chunk:
-            self.stream_char(char)
+        """Stream a chunk of JSON with typing effect.
 
-    def finalize_tool(self):
-        """Finalize tool output."""
-        console.print()
+        Styled tokens are batched and appended to the live view at natural
+        break points (FLUSH_CHARS) or every FLUSH_SIZE characters. In fast
+        mode the whole chunk is written as one ANSI byte string.
+        """
+        if self.fast_mode:
+            out = bytearray()
+            for text, style in self.lexer.feed(chunk):
+                out += ANSI_STYLES[style]
+                out += text.encode("utf-8")
+                out += ANSI_RESET
+            self.output.write(bytes(out))
+            return
+
+        for text, style in self.lexer.feed(chunk):
+            while text:
+                room = FLUSH_SIZE - len(self._pending)
+                piece, text = text[:room], text[room:]
+                self._pending.append(piece, style=style)
+                self._pending_sleep += self.typing_speed * len(piece)
+                if len(self._pending) >= FLUSH_SIZE or piece[-1] in FLUSH_CHARS:
+                    self._flush()
+        self._flush()
+
+    def finalize_tool(self, data: Any = None):
+        """Finalize tool output.
+
+        The parsed arguments are pretty printed only for PRETTY_PRINT_TOOLS;
+        for other tools that would just repeat the streamed JSON.
+        """
+        self._flush()
+        self.output.call(self._stop_live)
+        self.output.print()
         
-        # Try to parse and pretty print if complete
-        try:
-            data = json.loads(self.json_buffer)
-            console.print()
-            console.print("[dim]─── Parsed Result ───[/dim]")
+        if data is not None and self.tool_name.lower() in PRETTY_PRINT_TOOLS:
+            self.output.print()
+            self.output.print("[dim]─── Parsed Result ───[/dim]")
             self._print_parsed_json(data)
-        except json.JSONDecodeError:
-            # Incomplete JSON, skip pretty print
-            pass
         
-        color = self._get_color_for_tool(self.tool_name)
-        console.print(f"[bold {color}]╰─────────────────────╯[/bold {color}]")
-        console.print()
+        color = self.color
+        self.output.print(f"[bold {color}]╰─────────────────────╯[/bold {color}]")
+        self.output.print()
         
-        # Reset buffer
-        self.json_buffer = ""
+        # Reset lexer
+        self.lexer.reset()
 
     def _print_parsed_json(self, data: Dict[str, Any], indent: int = 0):
         """Print parsed JSON in a readable format."""
@@ -234,36 +626,121 @@ class JSONStreamPrinter:
         if isinstance(data, dict):
             for key, value in data.items():
                 if isinstance(value, (dict, list)):
-                    console.print(f"{indent_str}[bold green]{key}:[/bold green]")
+                    self.output.print(f"{indent_str}[bold green]{key}:[/bold green]")
                     self._print_parsed_json(value, indent + 1)
                 elif isinstance(value, str) and len(value) > 80:
-                    console.print(f"{indent_str}[bold green]{key}:[/bold green] [dim]{value[:80]}...[/dim]")
+                    self.output.print(f"{indent_str}[bold green]{key}:[/bold green] [dim]{value[:80]}...[/dim]")
                 else:
-                    console.print(f"{indent_str}[bold green]{key}:[/bold green] {value}")
+                    self.output.print(f"{indent_str}[bold green]{key}:[/bold green] {value}")
         elif isinstance(data, list):
             for i, item in enumerate(data, 1):
                 if isinstance(item, (dict, list)):
-                    console.print(f"{indent_str}[yellow]{i}.[/yellow]")
+                    self.output.print(f"{indent_str}[yellow]{i}.[/yellow]")
                     self._print_parsed_json(item, indent + 1)
                 else:
-                    console.print(f"{indent_str}[yellow]•[/yellow] {item}")
+                    self.output.print(f"{indent_str}[yellow]•[/yellow] {item}")
+
+
+class DebugLogWriter:
+    """Debug log file written by a background thread.
+
+    `write` only enqueues the line, so logging never blocks the event
+    loop; the writer thread writes queued lines in batches through a
+    DEBUG_BUFFER_SIZE buffer and flushes at most every DEBUG_FLUSH_INTERVAL.
+    """
+
+    def __init__(self, filename: str):
+        self._file = open(filename, "w", encoding="utf-8", buffering=DEBUG_BUFFER_SIZE)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, msg: str):
+        self._queue.put(msg)
+
+    def close(self):
+        """Write out all queued lines and close the file."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        with self._file:
+            while True:
+                try:
+                    msg = self._queue.get(timeout=DEBUG_FLUSH_INTERVAL)
+                except queue.Empty:
+                    self._file.flush()
+                    continue
+                # Drain whatever else is queued into one batch
+                lines = []
+                while msg is not None:
+                    lines.append(msg + "\n")
+                    try:
+                        msg = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                self._file.writelines(lines)
+                if msg is None:
+                    break
+                now = time.monotonic()
+                if now - last_flush >= DEBUG_FLUSH_INTERVAL:
+                    self._file.flush()
+                    last_flush = now
 
 
 class LocalAgentStreamHandler:
     """Handle local agent execution with streaming output."""
 
-    def __init__(self, typing_speed: float = 0.001, debug: bool = False):
+    def __init__(self, typing_speed: float = 0.001, debug: bool = False, fast_mode: bool = False):
         self.typing_speed = typing_speed
         self.debug = debug
+        # Raw ANSI output needs a real color terminal with a file descriptor; otherwise fall back to Rich
+        self.fast_mode = (
+            fast_mode
+            and console.is_terminal
+            and console.color_system is not None
+            and not console.legacy_windows
+            and console_fileno() is not None
+        )
         self.debug_file = None
         self.tools = {}  # {tool_id: {name, printer, buffer}}
+        self.chunk_num = 0
+        self._index_ids = {}  # {tool call index: id}, for deltas that carry no id
         self.agent = None
 
+    def reset(self):
+        """Clear per-run state, so one handler can stream several agent runs."""
+        if self.debug_file:
+            self.debug_file.close()
+            self.debug_file = None
+        self.tools.clear()
+        self._index_ids.clear()
+        self.chunk_num = 0
+
     def _log(self, msg: str):
         """Debug logging."""
         if self.debug and self.debug_file:
-            self.debug_file.write(msg + "\n")
-            self.debug_file.flush()
+            self.debug_file.write(msg)
+
+    async def _sse_payloads(self, frames):
+        """Yield parsed chunk dicts from SSE frames, stopping at `[DONE]`.
+
+        orjson tolerates the trailing blank line, so payloads are parsed
+        straight from the slice after the prefix without stripping.
+        """
+        async for frame in frames:
+            self.chunk_num += 1
+            if self.debug:
+                self._log(f"\n{'='*60}\nCHUNK #{self.chunk_num}\n{'='*60}\n{frame}")
+            if not frame.startswith(SSE_PREFIX):
+                continue
+            if frame.startswith(SSE_DONE, len(SSE_PREFIX)):
+                return
+            try:
+                yield orjson.loads(frame[len(SSE_PREFIX):])
+            except orjson.JSONDecodeError:
+                continue
 
     async def stream_agent(self, agent: SGRVampiCodeAgent) -> tuple[str, list | None, str]:
         """Stream agent execution with beautiful JSON output."""
@@ -272,137 +749,65 @@ class LocalAgentStreamHandler:
         if self.debug:
             import datetime
             filename = f"debug_stream_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            self.debug_file = open(filename, "w", encoding="utf-8")
+            self.debug_file = DebugLogWriter(filename)
             console.print(f"[dim]📝 Debug: {filename}[/dim]\n")
         
+        try:
+            return await self._stream_agent(agent)
+        finally:
+            # Debug close (written out once, even if streaming failed)
+            if self.debug and self.debug_file:
+                self._log(f"\n{'='*60}\nEND - {self.chunk_num} chunks\n{'='*60}")
+                self.debug_file.close()
+                self.debug_file = None
+                console.print(f"\n[dim]✅ Debug saved ({self.chunk_num} chunks)[/dim]\n")
+
+    async def _stream_agent(self, agent: SGRVampiCodeAgent) -> tuple[str, list | None, str]:
         console.print(f"[dim]Agent: {agent.name}[/dim]")
         console.print(f"[dim]Session ID: ...{agent.id[-12:]}[/dim]")
         console.print()
         
-        chunk_num = 0
         clarifications = None
-        content_buffer = ""
+        content_parts = []
+        
+        # Render output in the background, so this loop never blocks on printing
+        output = RenderQueue(immediate=self.fast_mode)
+        output.start()
         
         # Start agent execution in background
         agent_task = asyncio.create_task(agent.execute())
+        streamed = False
         
         # Stream output from agent's streaming generator
         try:
-            async for chunk_data in agent.streaming_generator.stream():
-                chunk_num += 1
-                self._log(f"\n{'='*60}\nCHUNK #{chunk_num}\n{'='*60}\n{chunk_data}")
-                
-                # Parse SSE format: "data: {json}\n\n"
-                if not chunk_data.startswith("data: "):
-                    continue
-                
-                data_str = chunk_data[6:].strip()
-                if data_str == "[DONE]":
-                    break
-                
-                try:
-                    chunk = json.loads(data_str)
-                except json.JSONDecodeError:
-                    continue
-                
-                # Extract delta from chunk
-                if "choices" not in chunk or not chunk["choices"]:
-                    continue
-                
-                choice = chunk["choices"][0]
-                delta = choice.get("delta", {})
-                
-                # === HANDLE TOOL CALLS ===
-                if "tool_calls" in delta and delta["tool_calls"]:
-                    for tc in delta["tool_calls"]:
-                        if "function" not in tc:
-                            continue
-                        
-                        tool_id = tc.get("id", f"idx_{tc.get('index', 0)}")
-                        
-                        # Initialize tool
-                        if tool_id not in self.tools:
-                            self.tools[tool_id] = {
-                                "name": "",
-                                "printer": JSONStreamPrinter(typing_speed=self.typing_speed),
-                                "buffer": "",
-                                "completed": False,
-                                "header_printed": False
-                            }
-                        
-                        tool = self.tools[tool_id]
-                        
-                        # Update name
-                        func = tc["function"]
-                        if "name" in func and func["name"]:
-                            tool["name"] = func["name"]
-                            if not tool["header_printed"]:
-                                tool["printer"].print_tool_header(tool["name"])
-                                tool["header_printed"] = True
-                            self._log(f"Tool: {tool['name']}")
-                        
-                        # Stream arguments character by character
-                        if "arguments" in func and func["arguments"]:
-                            args = func["arguments"]
-                            tool["buffer"] = args  # Full arguments in one chunk
-                            
-                            # Stream each character
-                            tool["printer"].stream_chunk(args)
-                            
-                            self._log(f"  Streamed: {len(args)} chars")
-                            
-                            # Check if JSON is complete
-                            try:
-                                data = json.loads(tool["buffer"])
-                                if not tool["completed"]:
-                                    self._log(f"  ✓ JSON complete for {tool['name']}")
-                                    tool["completed"] = True
-                                    
-                                    # Finalize output
-                                    tool["printer"].finalize_tool()
-                                    
-                                    # Handle clarifications
-                                    if tool["name"].lower() == "clarificationtool":
-                                        clarifications = data.get("questions", [])
-                                    
-                                    # Render FinalAnswerTool as Markdown
-                                    if tool["name"].lower() == "finalanswertool" and "answer" in data:
-                                        console.print("\n")
-                                        console.print(Panel(
-                                            Markdown(data["answer"]),
-                                            title="📋 Ответ",
-                                            border_style="green",
-                                            padding=(1, 2)
-                                        ))
-                            
-                            except json.JSONDecodeError:
-                                # Still accumulating
-                                pass
-                
-                # === HANDLE CONTENT ===
-                if "content" in delta and delta["content"]:
-                    text = delta["content"]
-                    content_buffer += text
-                    
-                    # Only stream non-JSON text
-                    stripped = text.strip()
-                    if stripped and not stripped.startswith('{') and not stripped.startswith('}'):
-                        console.print(text, end="", style="white")
-                        sys.stdout.flush()
-        
+            clarifications = await self._consume_stream(agent, output, content_parts)
+            streamed = True
         except Exception as e:
-            console.print(f"\n[red]Streaming error: {e}[/red]")
-            console.print(f"[yellow]Error type: {type(e).__name__}[/yellow]")
+            output.print(f"\nStreaming error: {e}", style="red", markup=False, highlight=False)
+            output.print(f"[yellow]Error type: {type(e).__name__}[/yellow]")
             if hasattr(e, 'response'):
-                console.print(f"[yellow]Response: {e.response}[/yellow]")
+                output.print(f"Response: {e.response}", style="yellow", markup=False, highlight=False)
             if hasattr(e, 'body'):
-                console.print(f"[yellow]Body: {e.body}[/yellow]")
-            import traceback
-            console.print(f"[dim]{traceback.format_exc()}[/dim]")
+                output.print(f"Body: {e.body}", style="yellow", markup=False, highlight=False)
+            output.print(format_traceback(e), style="dim", markup=False, highlight=False)
+        finally:
+            try:
+                # Let the renderer catch up with everything streamed so far
+                await output.close()
+            finally:
+                for tool in self.tools.values():
+                    tool["printer"].close()
+                if not streamed and not agent_task.done():
+                    # Nothing consumes the agent's stream any more
+                    agent_task.cancel()
         
-        # Wait for agent to complete
+        # Wait for agent to complete (or to finish cancelling)
         try:
             await agent_task
+        except asyncio.CancelledError:
+            if not agent_task.cancelled():
+                raise
+            console.print("\n[yellow]Agent execution cancelled[/yellow]")
         except Exception as e:
             console.print(f"\n[red]Agent execution error: {e}[/red]")
             console.print(f"[yellow]Error type: {type(e).__name__}[/yellow]")
@@ -412,16 +817,125 @@ class LocalAgentStreamHandler:
                 console.print(f"[yellow]Body: {e.body}[/yellow]")
             if hasattr(e, 'message'):
                 console.print(f"[yellow]Message: {e.message}[/yellow]")
-            import traceback
-            console.print(f"[dim]{traceback.format_exc()}[/dim]")
+            console.print(f"[dim]{format_traceback(e)}[/dim]")
         
-        # Debug close
-        if self.debug and self.debug_file:
-            self._log(f"\n{'='*60}\nEND - {chunk_num} chunks\n{'='*60}")
-            self.debug_file.close()
-            console.print(f"\n[dim]✅ Debug saved ({chunk_num} chunks)[/dim]\n")
+        return "".join(content_parts), clarifications, agent.name
+
+    async def _consume_stream(
+        self, agent: SGRVampiCodeAgent, output: RenderQueue, content_parts: list[str]
+    ) -> list | None:
+        """Render the agent's stream until `[DONE]`, collecting streamed text into `content_parts`.
+
+        Returns clarification questions, if the agent asked any.
+        """
+        clarifications = None
+        async for chunk in self._sse_payloads(agent.streaming_generator.stream()):
+            # Extract delta from chunk
+            choices = chunk.get("choices")
+            if not choices:
+                continue
+
+            delta = choices[0].get("delta") or {}
+
+            # === HANDLE TOOL CALLS ===
+            tool_calls = delta.get("tool_calls")
+            if tool_calls:
+                for tc in tool_calls:
+                    func = tc.get("function")
+                    if not func:
+                        continue
+
+                    # Only the first delta of a streamed call carries its id
+                    index = tc.get("index", 0)
+                    tool_id = tc.get("id")
+                    if tool_id:
+                        self._index_ids[index] = tool_id
+                    else:
+                        tool_id = self._index_ids.get(index, f"idx_{index}")
+
+                    # Initialize tool
+                    if tool_id not in self.tools:
+                        self.tools[tool_id] = {
+                            "name": "",
+                            "printer": JSONStreamPrinter(
+                                output, typing_speed=self.typing_speed, fast_mode=self.fast_mode
+                            ),
+                            "buffer": "",
+                            "completed": False,
+                            "header_printed": False
+                        }
+
+                    tool = self.tools[tool_id]
+
+                    # Update name
+                    if func.get("name"):
+                        tool["name"] = func["name"]
+                        if not tool["header_printed"]:
+                            tool["printer"].print_tool_header(tool["name"])
+                            tool["header_printed"] = True
+                        if self.debug:
+                            self._log(f"Tool: {tool['name']}")
+
+                    # Stream arguments character by character
+                    args = func.get("arguments")
+                    if args and not tool["completed"]:
+                        # Arguments come either as a full snapshot or as a delta
+                        buffer = tool["buffer"]
+                        if buffer and args.startswith(buffer):
+                            tail = args[len(buffer):]
+                            tool["buffer"] = args
+                        else:
+                            tail = args
+                            tool["buffer"] = buffer + args
+
+                        # Stream only the new characters (this also advances the lexer's depth)
+                        tool["printer"].stream_chunk(tail)
+
+                        if self.debug:
+                            self._log(f"  Streamed: {len(tail)} chars")
+
+                        # Check if JSON is complete (only once its braces are balanced)
+                        if tool["printer"].lexer.depth:
+                            continue
+                        try:
+                            data = orjson.loads(tool["buffer"])
+                            if not tool["completed"]:
+                                if self.debug:
+                                    self._log(f"  ✓ JSON complete for {tool['name']}")
+                                tool["completed"] = True
+
+                                # Finalize output (pretty print reuses the parsed arguments)
+                                tool["printer"].finalize_tool(data)
+
+                                # Handle clarifications
+                                if tool["name"].lower() == "clarificationtool":
+                                    clarifications = data.get("questions", [])
+
+                                # Render FinalAnswerTool as Markdown
+                                if tool["name"].lower() == "finalanswertool" and "answer" in data:
+                                    output.print("\n")
+                                    output.print(Panel(
+                                        Markdown(data["answer"]),
+                                        title="📋 Ответ",
+                                        border_style="green",
+                                        padding=(1, 2)
+                                    ))
+
+                        except orjson.JSONDecodeError:
+                            # Still accumulating
+                            pass
+
+            # === HANDLE CONTENT ===
+            text = delta.get("content")
+            if text:
+                content_parts.append(text)
+
+                # Only stream non-JSON text
+                stripped = text.strip()
+                if stripped and not stripped.startswith('{') and not stripped.startswith('}'):
+                    output.print(text, end="", style="white", markup=False, highlight=False)
         
-        return content_buffer, clarifications, agent.name
+        return clarifications
 
 
 @app.command()
@@ -438,6 +952,38 @@ def chat(
     workspace_path = os.path.abspath(workspace)
     console.print(f"[dim]Workspace: {workspace_path}[/dim]\n")
     
+    # One event loop and one handler for the whole session
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    handler = LocalAgentStreamHandler(typing_speed=typing_speed, debug=debug)
+    try:
+        _chat_loop(loop, handler, workspace_path, debug)
+    finally:
+        handler.reset()
+        # The cleanup asyncio.run would do for a loop it owns
+        try:
+            _cancel_pending_tasks(loop)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            loop.close()
+            asyncio.set_event_loop(None)
+
+
+def _cancel_pending_tasks(loop: asyncio.AbstractEventLoop):
+    """Cancel tasks left running by a turn (e.g. an interrupted agent) and wait until they finish."""
+    pending = [task for task in asyncio.all_tasks(loop) if not task.done()]
+    if not pending:
+        return
+    for task in pending:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+
+
+def _chat_loop(
+    loop: asyncio.AbstractEventLoop, handler: LocalAgentStreamHandler, workspace_path: str, debug: bool
+):
+    """Read user messages and stream agent responses until the user exits."""
     while True:
         # Get input
         try:
@@ -447,16 +993,17 @@ def chat(
             break
         
         # Commands
-        if user_input.lower() in ["/exit", "/quit", "/q"]:
+        command = COMMANDS.get(user_input.strip().lower())
+        if command == "exit":
             console.print("[yellow]👋 Goodbye![/yellow]")
             break
         
-        if user_input.lower() in ["/clear", "/cls"]:
+        if command == "clear":
             os.system("clear" if os.name != "nt" else "cls")
             print_banner()
             continue
         
-        if user_input.lower() in ["/help", "/h"]:
+        if command == "help":
             console.print("""
 [bold red]╔═══════════════════════════ СПРАВКА ════════════════════════════╗[/bold red]
 
@@ -499,8 +1046,8 @@ def chat(
             # Create new agent for each message
             # Each agent instance is independent and completes its task
             agent = SGRVampiCodeAgent(task=user_input, working_directory=workspace_path)
-            handler = LocalAgentStreamHandler(typing_speed=typing_speed, debug=debug)
-            content, clarifications, agent_name = asyncio.run(handler.stream_agent(agent))
+            handler.reset()
+            content, clarifications, agent_name = loop.run_until_complete(handler.stream_agent(agent))
             
             # Handle clarifications
             if clarifications:
@@ -511,9 +1058,12 @@ def chat(
                 # Get clarification response
                 clarification_response = Prompt.ask("\n[bold cyan]Your answer[/bold cyan]")
                 if clarification_response.strip():
-                    asyncio.run(agent.provide_clarification(clarification_response))
-                    handler = LocalAgentStreamHandler(typing_speed=typing_speed, debug=debug)
-                    content, clarifications, agent_name = asyncio.run(handler.stream_agent(agent))
+                    loop.run_until_complete(agent.provide_clarification(clarification_response))
+                    handler.reset()
+                    content, clarifications, agent_name = loop.run_until_complete(handler.stream_agent(agent))
+        
+        except KeyboardInterrupt:
+            console.print("\n[yellow]⏹ Interrupted[/yellow]")
         
         except Exception as e:
             console.print(f"\n[red]Error: {e}[/red]")
@@ -525,20 +1075,15 @@ def chat(
             if hasattr(e, 'status_code'):
                 console.print(f"[yellow]Status code: {e.status_code}[/yellow]")
             if debug:
-                import traceback
-                console.print(f"[dim]{traceback.format_exc()}[/dim]")
+                console.print(f"[dim]{format_traceback(e)}[/dim]")
+        
+        finally:
+            # Nothing from this turn may keep running (and executing tools) into the next one
+            _cancel_pending_tasks(loop)
 
 
-@app.command()
-def task(
-    prompt: str = typer.Argument(..., help="Task to execute"),
-    debug: bool = typer.Option(False, "--debug", "-d", help="Enable debug logging"),
-    typing_speed: float = typer.Option(0.001, "--speed", "-s", help="Typing speed"),
-    workspace: str = typer.Option(".", "--workspace", "-w", help="Workspace path for the agent")
-):
-    """
-    Execute a single task with streaming JSON output using local agent.
-    """
+def _run_single(prompt: str, workspace: str, typing_speed: float, debug: bool, fast_mode: bool = False):
+    """Run one task with a local agent and stream its output (shared by `task` and `fast`)."""
     workspace_path = os.path.abspath(workspace)
     console.print(f"[bold cyan]Task:[/bold cyan] {prompt}\n")
     console.print(f"[dim]Workspace: {workspace_path}[/dim]\n")
@@ -546,7 +1091,7 @@ def task(
     
     try:
         agent = SGRVampiCodeAgent(task=prompt, working_directory=workspace_path)
-        handler = LocalAgentStreamHandler(typing_speed=typing_speed, debug=debug)
+        handler = LocalAgentStreamHandler(typing_speed=typing_speed, debug=debug, fast_mode=fast_mode)
         content, clarifications, _ = asyncio.run(handler.stream_agent(agent))
         
         if clarifications:
@@ -558,11 +1103,23 @@ def task(
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
         if debug:
-            import traceback
-            console.print(f"[dim]{traceback.format_exc()}[/dim]")
+            console.print(f"[dim]{format_traceback(e)}[/dim]")
         raise typer.Exit(1)
 
 
+@app.command()
+def task(
+    prompt: str = typer.Argument(..., help="Task to execute"),
+    debug: bool = typer.Option(False, "--debug", "-d", help="Enable debug logging"),
+    typing_speed: float = typer.Option(0.001, "--speed", "-s", help="Typing speed"),
+    workspace: str = typer.Option(".", "--workspace", "-w", help="Workspace path for the agent")
+):
+    """
+    Execute a single task with streaming JSON output using local agent.
+    """
+    _run_single(prompt, workspace, typing_speed, debug)
+
+
 @app.command()
 def fast(
     prompt: str = typer.Argument(..., help="Task to execute"),
@@ -572,27 +1129,7 @@ def fast(
     """
     Execute task with instant output (no typing effect) using local agent.
     """
-    workspace_path = os.path.abspath(workspace)
-    console.print(f"[bold cyan]Task:[/bold cyan] {prompt}\n")
-    console.print(f"[dim]Workspace: {workspace_path}[/dim]\n")
-    console.print("[bold green]═══ Agent Response ═══[/bold green]\n")
-    
-    try:
-        agent = SGRVampiCodeAgent(task=prompt, working_directory=workspace_path)
-        handler = LocalAgentStreamHandler(typing_speed=0, debug=debug)
-        content, clarifications, _ = asyncio.run(handler.stream_agent(agent))
-        
-        if clarifications:
-            console.print("\n[bold yellow]❓ Questions:[/bold yellow]")
-            for i, q in enumerate(clarifications, 1):
-                console.print(f"  {i}. {q}")
-    
-    except Exception as e:
-        console.print(f"[red]Error: {e}[/red]")
-        if debug:
-            import traceback
-            console.print(f"[dim]{traceback.format_exc()}[/dim]")
-        raise typer.Exit(1)
+    _run_single(prompt, workspace, 0, debug, fast_mode=True)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
 import json
 import logging
 import os
-import traceback
+import time
 import uuid
+from collections import deque
 from datetime import datetime
 from typing import Type
 
@@ -23,6 +24,32 @@ from sgr_deep_research.settings import get_config
 
 config = get_config()
 
+# Number of most recent log entries kept in memory; the full log is streamed to a JSONL file
+LOG_HISTORY_SIZE = 1000
+# Characters of a tool result shown in the execution debug log
+RESULT_PREVIEW_CHARS = 400
+# Debug log templates, formatted only when INFO is enabled
+REASONING_LOG_TEMPLATE = """
+    ###############################################
+    🤖 LLM RESPONSE DEBUG:
+       🧠 Reasoning Steps: {reasoning_steps}
+       📊 Current Situation: '{current_situation}...'
+       📋 Plan Status: '{plan_status}...'
+       🔍 Searches Done: {searches_used}
+       🔍 Clarifications Done: {clarifications_used}
+       ✅ Enough Data: {enough_data}
+       📝 Remaining Steps: {remaining_steps}
+       🏁 Task Completed: {task_completed}
+       ➡️ Next Step: {next_step}
+    ###############################################"""
+TOOL_EXECUTION_LOG_TEMPLATE = """
+###############################################
+🛠️ TOOL EXECUTION DEBUG:
+    🔧 Tool Name: {tool_name}
+    📋 Tool Model: {tool_model}
+    🔍 Result: '{preview}'
+###############################################"""
+
 
 class BaseAgent:
     """Base class for agents."""
@@ -45,8 +72,13 @@ class BaseAgent:
         self.tracking_token = tracking_token
 
         self._context = ResearchContext(working_directory=working_directory)
-        self.conversation = []
-        self.log = []
+        self.conversation: deque[dict] = deque()
+        # Log entries carry monotonic offsets from this wall-clock start
+        self._started_at = datetime.now()
+        self._started_mono = time.monotonic()
+        self.log: deque[dict] = deque(maxlen=LOG_HISTORY_SIZE)
+        self._log_path: str | None = None
+        self._log_file = None
         self.max_iterations = max_iterations
         self.max_clarifications = max_clarifications
 
@@ -74,45 +106,42 @@ class BaseAgent:
         self.logger.info(f"✅ Clarification received: {clarifications[:2000]}...")
 
     def _log_reasoning(self, result: ReasoningTool) -> None:
-        next_step = result.remaining_steps[0] if result.remaining_steps else "Completing"
-        self.logger.info(
-            f"""
-    ###############################################
-    🤖 LLM RESPONSE DEBUG:
-       🧠 Reasoning Steps: {result.reasoning_steps}
-       📊 Current Situation: '{result.current_situation[:400]}...'
-       📋 Plan Status: '{result.plan_status[:400]}...'
-       🔍 Searches Done: {self._context.searches_used}
-       🔍 Clarifications Done: {self._context.clarifications_used}
-       ✅ Enough Data: {result.enough_data}
-       📝 Remaining Steps: {result.remaining_steps}
-       🏁 Task Completed: {result.task_completed}
-       ➡️ Next Step: {next_step}
-    ###############################################"""
-        )
-        self.log.append(
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(
+                REASONING_LOG_TEMPLATE.format(
+                    reasoning_steps=result.reasoning_steps,
+                    current_situation=result.current_situation[:400],
+                    plan_status=result.plan_status[:400],
+                    searches_used=self._context.searches_used,
+                    clarifications_used=self._context.clarifications_used,
+                    enough_data=result.enough_data,
+                    remaining_steps=result.remaining_steps,
+                    task_completed=result.task_completed,
+                    next_step=result.remaining_steps[0] if result.remaining_steps else "Completing",
+                )
+            )
+        self._append_log(
             {
                 "step_number": self._context.iteration,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp_offset": time.monotonic() - self._started_mono,
                 "step_type": "reasoning",
                 "agent_reasoning": result.model_dump(),
             }
         )
 
     def _log_tool_execution(self, tool: BaseTool, result: str):
-        self.logger.info(
-            f"""
-###############################################
-🛠️ TOOL EXECUTION DEBUG:
-    🔧 Tool Name: {tool.tool_name}
-    📋 Tool Model: {tool.model_dump_json(indent=2)}
-    🔍 Result: '{result[:400]}...'
-###############################################"""
-        )
-        self.log.append(
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(
+                TOOL_EXECUTION_LOG_TEMPLATE.format(
+                    tool_name=tool.tool_name,
+                    tool_model=tool.model_dump_json(indent=2),
+                    preview=result[:RESULT_PREVIEW_CHARS] + "..." if len(result) > RESULT_PREVIEW_CHARS else result,
+                )
+            )
+        self._append_log(
             {
                 "step_number": self._context.iteration,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp_offset": time.monotonic() - self._started_mono,
                 "step_type": "tool_execution",
                 "tool_name": tool.tool_name,
                 "agent_tool_context": tool.model_dump(),
@@ -120,7 +149,28 @@ class BaseAgent:
             }
         )
 
+    def _append_log(self, entry: dict) -> None:
+        """Keep entry in the bounded in-memory log and append it to the JSONL log file."""
+        self.log.append(entry)
+        if self._log_file is None:
+            if self._log_path is None:
+                logs_dir = config.execution.logs_dir
+                os.makedirs(logs_dir, exist_ok=True)
+                self._log_path = os.path.join(
+                    logs_dir, f"{self._started_at.strftime('%Y%m%d-%H%M%S')}-{self.id}-log.jsonl"
+                )
+            self._log_file = open(self._log_path, "a", encoding="utf-8", buffering=8192)
+            if self._log_file.tell() == 0:
+                self._log_file.write(
+                    json.dumps({"id": self.id, "session_start": self._started_at.isoformat()}) + "\n"
+                )
+        self._log_file.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
     def _save_agent_log(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
         logs_dir = config.execution.logs_dir
         os.makedirs(logs_dir, exist_ok=True)
         filepath = os.path.join(logs_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self.id}-log.json")
@@ -128,11 +178,14 @@ class BaseAgent:
             "id": self.id,
             "model_config": config.openai.model_dump(exclude={"api_key", "proxy"}),
             "task": self.task,
+            "session_start": self._started_at.isoformat(),
             "toolkit": [tool.tool_name for tool in self.toolkit],
-            "log": self.log,
+            "log": list(self.log),
+            "full_log_file": self._log_path,
         }
 
-        json.dump(agent_log, open(filepath, "w", encoding="utf-8"), indent=2, ensure_ascii=False)
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(agent_log, f, indent=2, ensure_ascii=False)
 
     async def _prepare_context(self) -> list[dict]:
         """Prepare conversation context with system prompt."""
@@ -156,6 +209,15 @@ class BaseAgent:
         """
         raise NotImplementedError("_select_action_phase must be implemented by subclass")
 
+    async def _reason_and_act(self) -> tuple[ReasoningTool, BaseTool]:
+        """Decide the next action for the current step.
+
+        Returns the reasoning and the selected tool. By default runs the reasoning and select action phases
+        in sequence; subclasses may combine them into a single LLM call.
+        """
+        reasoning = await self._reasoning_phase()
+        return reasoning, await self._select_action_phase(reasoning)
+
     async def _action_phase(self, tool: BaseTool) -> str:
         """Call Tool for the action decided in select_action phase.
 
@@ -180,15 +242,13 @@ class BaseAgent:
                 self._context.iteration += 1
                 self.logger.info(f"Step {self._context.iteration} started")
 
-                reasoning = await self._reasoning_phase()
+                reasoning, action_tool = await self._reason_and_act()
                 self._context.current_step_reasoning = reasoning
-                action_tool = await self._select_action_phase(reasoning)
                 await self._action_phase(action_tool)
 
         except Exception as e:
-            self.logger.error(f"❌ Agent execution error: {str(e)}")
+            self.logger.exception(f"❌ Agent execution error: {str(e)}")
             self._context.state = AgentStatesEnum.FAILED
-            traceback.print_exc()
         finally:
             if self.streaming_generator is not None:
                 self.streaming_generator.finish()
@@ -89,6 +89,7 @@ class SGRResearchAgent(BaseAgent):
         tool = reasoning.function
         if not isinstance(tool, BaseTool):
             raise ValueError("Selected tool is not a valid BaseTool instance")
+        arguments = tool.model_dump_json()
         self.conversation.append(
             {
                 "role": "assistant",
@@ -99,19 +100,20 @@ class SGRResearchAgent(BaseAgent):
                         "id": f"{self._context.iteration}-action",
                         "function": {
                             "name": tool.tool_name,
-                            "arguments": tool.model_dump_json(),
+                            "arguments": arguments,
                         },
                     }
                 ],
             }
         )
-        self.streaming_generator.add_tool_call(
-            f"{self._context.iteration}-action", tool.tool_name, tool.model_dump_json()
-        )
+        self.streaming_generator.add_tool_call(f"{self._context.iteration}-action", tool.tool_name, arguments)
         return tool
 
+    async def _execute_tool(self, tool: BaseTool) -> str:
+        return await tool(self._context)
+
     async def _action_phase(self, tool: BaseTool) -> str:
-        result = await tool(self._context)
+        result = await self._execute_tool(tool)
         self.conversation.append(
             {"role": "tool", "content": result, "tool_call_id": f"{self._context.iteration}-action"}
         )
@@ -1,6 +1,9 @@
 
 
-from typing import Literal, Type
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Iterable, Literal, Type
 
 from openai import pydantic_function_tool
 from openai.types.chat import ChatCompletionFunctionToolParam
@@ -15,10 +18,27 @@ from sgr_deep_research.core.tools import (
     coding_agent_tools,
     system_agent_tools,
 )
+from sgr_deep_research.core.tools.coding import HISTORY_ARCHIVE_SUFFIX, RecallHistoryTool
 from sgr_deep_research.settings import get_config
 
 config = get_config()
 
+# Constant marker so the truncated prefix stays byte-identical for provider-side prompt caching
+TRUNCATION_MARKER = {"role": "system", "content": "[Conversation truncated. Earlier messages were omitted.]"}
+# Model name fragments of backends that cache prompt prefixes only when marked with cache_control
+CACHE_CONTROL_MODELS = ("claude", "anthropic")
+# Messages allowed over the limit before truncating, so the pass and prefix change run once per batch
+TRUNCATION_SLACK = 8
+# Forced reasoning tool choice, built once instead of per reasoning call
+REASONING_TOOL_CHOICE = {"type": "function", "function": {"name": ReasoningTool.tool_name}}
+# Prebuilt completion used when the model answers with plain text instead of a tool call
+FINAL_ANSWER_TEMPLATE = FinalAnswerTool.model_construct(
+    reasoning="Agent decided to complete the task",
+    completed_steps=[],
+    answer="",
+    status=AgentStatesEnum.COMPLETED,
+)
+
 
 class SGRVampiCodeAgent(SGRResearchAgent):
     """Coding agent with continuous dialogue and conversation truncation.
@@ -51,17 +71,39 @@ class SGRVampiCodeAgent(SGRResearchAgent):
             tracking_token=tracking_token,
             working_directory=working_directory,
         )
-        self.toolkit = [
-            *system_agent_tools,
-            *coding_agent_tools,
-            *(toolkit if toolkit else []),
-        ]
+        # Order-preserving dedup, frozen so prompt and tool schemas list each tool once
+        self.toolkit: tuple[Type[BaseTool], ...] = tuple(
+            dict.fromkeys(
+                [
+                    *system_agent_tools,
+                    *coding_agent_tools,
+                    *(toolkit if toolkit else []),
+                ]
+            )
+        )
         self.tool_choice: Literal["required"] = "required"
         self.max_conversation_messages = max_conversation_messages
         self.continuous_mode = False  # Flag to track if this is continuing a conversation
+        # Toolkit is fixed after init, so the system prompt and tool schemas are built once
+        self._system_message = self._build_system_message()
+        # Persistent request messages: system prompt followed by a mirror of the conversation
+        self._messages_buffer: list[dict] = [self._system_message]
+        self._all_tools = self._build_tools(self.toolkit)
+        self._completion_tools = self._build_tools([ReasoningTool, FinalAnswerTool])
+        # LRU of (tool_name, arguments_json) -> result for cacheable read-only tools
+        self._tool_cache: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._tool_cache_max = 256
+        # Reasoning and action in one LLM call, until the backend rejects it
+        self.combined_calls = True
 
-    def _truncate_conversation(self):
+    @staticmethod
+    def _build_tools(tools: Iterable[Type[BaseTool]]) -> list[ChatCompletionFunctionToolParam]:
+        return [pydantic_function_tool(tool, name=tool.tool_name, description="") for tool in tools]
+
+    def _truncate_conversation(self) -> list[dict]:
         """Truncate conversation to keep last N messages while preserving system prompt.
+
+        Returns the dropped messages, to be archived by the caller.
         
         Strategy:
         - Always keep the initial user task message
@@ -69,67 +111,101 @@ class SGRVampiCodeAgent(SGRResearchAgent):
         - Preserve important context like clarifications
         - Maintain conversation coherence
         """
-        if len(self.conversation) <= self.max_conversation_messages:
-            return
-        
-        # Find important messages to preserve
-        initial_user_msg = None
-        clarification_msgs = []
-        
-        for i, msg in enumerate(self.conversation):
-            if msg.get("role") == "user" and not initial_user_msg:
-                initial_user_msg = (i, msg)
-            
-            # Preserve clarification-related messages
-            content = msg.get("content") or ""
-            if "clarification" in content.lower() or "уточнение" in content.lower():
-                clarification_msgs.append((i, msg))
+        if len(self.conversation) <= self.max_conversation_messages + TRUNCATION_SLACK:
+            return []
+
+        # Snapshot once: deque indexing and slicing are O(n)
+        messages = list(self.conversation)
+        original_count = len(messages)
+
+        # Single pass: find the initial user message and count clarification-related ones
+        initial_user_idx = -1
+        clarification_count = 0
+        for i, msg in enumerate(messages):
+            # Clarifications arrive as user messages; skip lowercasing large tool and assistant payloads
+            if msg["role"] != "user":
+                continue
+            if initial_user_idx < 0:
+                initial_user_idx = i
+            content = msg["content"]
+            if content:
+                content = content.lower()
+                if "clarification" in content or "уточнение" in content:
+                    clarification_count += 1
         
         # Calculate how many recent messages to keep
-        preserve_count = 1 if initial_user_msg else 0
-        preserve_count += len(clarification_msgs)
-        
+        preserve_count = (initial_user_idx >= 0) + clarification_count
         recent_messages_count = max(
             self.max_conversation_messages - preserve_count,
             self.max_conversation_messages // 2  # Keep at least half of limit as recent messages
         )
+
+        # Tail boundary computed once; never start the tail on orphaned tool results
+        tail_start = max(original_count - recent_messages_count, 0)
+        while tail_start < original_count and messages[tail_start].get("role") == "tool":
+            tail_start += 1
         
-        # Build truncated conversation
-        truncated = []
+        dropped = [
+            msg
+            for i, msg in enumerate(messages[:tail_start])
+            if i != initial_user_idx and msg is not TRUNCATION_MARKER
+        ]
+
+        # Rebuild truncated conversation in place
+        self.conversation.clear()
         
-        # Add initial user message if exists
-        if initial_user_msg:
-            truncated.append(initial_user_msg[1])
+        # Add initial user message if it falls outside the kept tail
+        if 0 <= initial_user_idx < tail_start:
+            self.conversation.append(messages[initial_user_idx])
         
         # Add truncation marker
-        if len(self.conversation) > self.max_conversation_messages:
-            truncated.append({
-                "role": "system",
-                "content": f"[Conversation truncated. Showing recent {recent_messages_count} messages from {len(self.conversation)} total]"
-            })
+        self.conversation.append(TRUNCATION_MARKER)
         
         # Add recent messages
-        recent_messages = self.conversation[-recent_messages_count:]
-        truncated.extend(recent_messages)
-        
-        self.conversation = truncated
+        self.conversation.extend(messages[tail_start:])
+        self._messages_buffer = [self._system_message, *self.conversation]
         self.logger.info(
             f"🔄 Conversation truncated: {len(self.conversation)} messages "
-            f"(from original {len(self.conversation) + len(recent_messages)} messages)"
+            f"(from original {original_count} messages)"
         )
+        return dropped
+
+    async def _archive_messages(self, messages: list[dict]) -> None:
+        """Append messages dropped by truncation to the compressed archive read by RecallHistoryTool.
+
+        Compression and file I/O run in a worker thread to keep the event loop free.
+        """
+        if not messages:
+            return
+        try:
+            if self._context.history_archive is None:
+                logs_dir = config.execution.logs_dir
+                os.makedirs(logs_dir, exist_ok=True)
+                self._context.history_archive = os.path.join(logs_dir, f"{self.id}{HISTORY_ARCHIVE_SUFFIX}")
+            await asyncio.to_thread(RecallHistoryTool.archive, self._context.history_archive, messages)
+        except Exception as e:
+            self.logger.warning(f"Failed to archive truncated messages: {e}")
 
     async def _prepare_context(self) -> list[dict]:
         """Prepare conversation context with system prompt and truncation."""
         # Truncate conversation if needed
-        self._truncate_conversation()
-        
-        # Use code-specific system prompt
-        system_prompt = self._get_code_system_prompt()
-        
-        return [
-            {"role": "system", "content": system_prompt},
-            *self.conversation,
-        ]
+        await self._archive_messages(self._truncate_conversation())
+        # Mirror only messages appended since the last call; deque indexing near the right end is O(1)
+        missing = len(self.conversation) - (len(self._messages_buffer) - 1)
+        if missing > 0:
+            self._messages_buffer.extend(self.conversation[i] for i in range(-missing, 0))
+        return self._messages_buffer
+
+    def _build_system_message(self) -> dict:
+        """Build the system message, marking it cacheable for backends that need it."""
+        content = self._get_code_system_prompt()
+        model = config.openai.model.lower()
+        if any(name in model for name in CACHE_CONTROL_MODELS):
+            return {
+                "role": "system",
+                "content": [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}],
+            }
+        return {"role": "system", "content": content}
 
     def _get_code_system_prompt(self) -> str:
         """Get code-specific system prompt."""
@@ -153,16 +229,10 @@ class SGRVampiCodeAgent(SGRResearchAgent):
 
     async def _prepare_tools(self) -> list[ChatCompletionFunctionToolParam]:
         """Prepare available tools for current agent state and progress."""
-        tools = set(self.toolkit)
-        
         # At max iterations, force completion
         if self._context.iteration >= self.max_iterations:
-            tools = {
-                ReasoningTool,
-                FinalAnswerTool,
-            }
-        
-        return [pydantic_function_tool(tool, name=tool.tool_name, description="") for tool in tools]
+            return self._completion_tools
+        return self._all_tools
 
     async def _reasoning_phase(self) -> ReasoningTool:
         """Reasoning phase with streaming support."""
@@ -172,7 +242,7 @@ class SGRVampiCodeAgent(SGRResearchAgent):
             "max_tokens": config.openai.max_tokens,
             "temperature": config.openai.temperature,
             "tools": await self._prepare_tools(),
-            "tool_choice": {"type": "function", "function": {"name": ReasoningTool.tool_name}},
+            "tool_choice": REASONING_TOOL_CHOICE,
             "extra_body": self._get_extra_body(),
         }
         
@@ -180,10 +250,17 @@ class SGRVampiCodeAgent(SGRResearchAgent):
             async for event in stream:
                 if event.type == "chunk":
                     self.streaming_generator.add_chunk(event.chunk)
-            reasoning: ReasoningTool = (
-                (await stream.get_final_completion()).choices[0].message.tool_calls[0].function.parsed_arguments
-            )
+            tool_call = (await stream.get_final_completion()).choices[0].message.tool_calls[0]
         
+        reasoning: ReasoningTool = tool_call.function.parsed_arguments
+        await self._record_reasoning(reasoning, tool_call.function.arguments)
+        return reasoning
+
+    async def _record_reasoning(self, reasoning: ReasoningTool, arguments: str | None = None) -> None:
+        """Append reasoning tool call and its result to the conversation.
+
+        Reuses the raw arguments string returned by the model when given.
+        """
         self.conversation.append(
             {
                 "role": "assistant",
@@ -194,7 +271,7 @@ class SGRVampiCodeAgent(SGRResearchAgent):
                         "id": f"{self._context.iteration}-reasoning",
                         "function": {
                             "name": reasoning.tool_name,
-                            "arguments": reasoning.model_dump_json(),
+                            "arguments": arguments or reasoning.model_dump_json(),
                         },
                     }
                 ],
@@ -205,10 +282,10 @@ class SGRVampiCodeAgent(SGRResearchAgent):
             {"role": "tool", "content": tool_call_result, "tool_call_id": f"{self._context.iteration}-reasoning"}
         )
         self._log_reasoning(reasoning)
-        return reasoning
 
     async def _select_action_phase(self, reasoning: ReasoningTool) -> BaseTool:
         """Select and execute action tool."""
+        arguments = None
         try:
             request_kwargs = {
                 "model": config.openai.model,
@@ -228,15 +305,14 @@ class SGRVampiCodeAgent(SGRResearchAgent):
             completion = await stream.get_final_completion()
 
             try:
-                tool = completion.choices[0].message.tool_calls[0].function.parsed_arguments
+                tool_call = completion.choices[0].message.tool_calls[0]
+                tool = tool_call.function.parsed_arguments
+                arguments = tool_call.function.arguments
             except (IndexError, AttributeError, TypeError):
                 # LLM returned a text response instead of a tool call - treat as completion
                 final_content = completion.choices[0].message.content or "Task completed successfully"
-                tool = FinalAnswerTool(
-                    reasoning="Agent decided to complete the task",
-                    completed_steps=[final_content],
-                    answer=final_content,
-                    status=AgentStatesEnum.COMPLETED,
+                tool = FINAL_ANSWER_TEMPLATE.model_copy(
+                    update={"completed_steps": [final_content], "answer": final_content}
                 )
         except Exception as e:
             # Handle validation errors or other streaming issues
@@ -249,9 +325,17 @@ class SGRVampiCodeAgent(SGRResearchAgent):
                 status=AgentStatesEnum.ERROR,
             )
         
+        return self._record_action(reasoning, tool, arguments)
+
+    def _record_action(self, reasoning: ReasoningTool, tool: BaseTool, arguments: str | None = None) -> BaseTool:
+        """Append selected action tool call to the conversation and stream it.
+
+        Reuses the raw arguments string returned by the model when given.
+        """
         if not isinstance(tool, BaseTool):
             raise ValueError("Selected tool is not a valid BaseTool instance")
         
+        arguments = arguments or tool.model_dump_json()
         self.conversation.append(
             {
                 "role": "assistant",
@@ -262,23 +346,101 @@ class SGRVampiCodeAgent(SGRResearchAgent):
                         "id": f"{self._context.iteration}-action",
                         "function": {
                             "name": tool.tool_name,
-                            "arguments": tool.model_dump_json(),
+                            "arguments": arguments,
                         },
                     }
                 ],
             }
         )
-        self.streaming_generator.add_tool_call(
-            f"{self._context.iteration}-action", tool.tool_name, tool.model_dump_json()
-        )
+        self.streaming_generator.add_tool_call(f"{self._context.iteration}-action", tool.tool_name, arguments)
         return tool
 
+    async def _reason_and_act(self) -> tuple[ReasoningTool, BaseTool]:
+        """Request reasoning and action tool calls in one LLM call.
+
+        A missing reasoning call is requested separately and recorded before the returned action,
+        a missing action is selected separately. If the backend rejects the combined call, the agent
+        switches to the two-phase flow for the rest of its run.
+        """
+        if not self.combined_calls:
+            return await super()._reason_and_act()
+
+        try:
+            request_kwargs = {
+                "model": config.openai.model,
+                "messages": await self._prepare_context(),
+                "max_tokens": config.openai.max_tokens,
+                "temperature": config.openai.temperature,
+                "tools": await self._prepare_tools(),
+                "tool_choice": self.tool_choice,
+                "parallel_tool_calls": True,
+                "extra_body": self._get_extra_body(),
+            }
+
+            async with self.openai_client.chat.completions.stream(**request_kwargs) as stream:
+                async for event in stream:
+                    if event.type == "chunk":
+                        self.streaming_generator.add_chunk(event.chunk)
+
+            tool_calls = (await stream.get_final_completion()).choices[0].message.tool_calls or []
+        except Exception as e:
+            self.logger.warning(f"Combined reasoning/action call failed: {e}, using two phases from now on")
+            self.combined_calls = False
+            return await super()._reason_and_act()
+
+        reasoning_call = None
+        action_call = None
+        for tool_call in tool_calls:
+            if tool_call.function.name == ReasoningTool.tool_name:
+                reasoning_call = reasoning_call or tool_call
+            elif action_call is None:
+                action_call = tool_call
+
+        reasoning = reasoning_call.function.parsed_arguments if reasoning_call else None
+        action = action_call.function.parsed_arguments if action_call else None
+        if not isinstance(action, BaseTool):
+            action = None
+
+        if isinstance(reasoning, ReasoningTool):
+            await self._record_reasoning(reasoning, reasoning_call.function.arguments)
+        elif action is not None:
+            # Keep the returned action, only the reasoning step is forced (and recorded first)
+            reasoning = await self._reasoning_phase()
+        else:
+            return await super()._reason_and_act()
+
+        if action is None:
+            return reasoning, await self._select_action_phase(reasoning)
+        return reasoning, self._record_action(reasoning, action, action_call.function.arguments)
+
+    async def _execute_tool(self, tool: BaseTool) -> str:
+        """Execute tool, serving repeated read-only calls from the LRU cache."""
+        if not tool.cacheable:
+            # Writes, edits and commands may change what read-only tools return
+            self._tool_cache.clear()
+            return await tool(self._context)
+
+        key = (tool.tool_name, tool.model_dump_json())
+        result = self._tool_cache.get(key)
+        if result is not None:
+            self._tool_cache.move_to_end(key)
+            self.logger.info(f"♻️ Tool cache hit: {tool.tool_name}")
+            return result
+
+        result = await tool(self._context)
+        self._tool_cache[key] = result
+        if len(self._tool_cache) > self._tool_cache_max:
+            self._tool_cache.popitem(last=False)
+        return result
+
     async def continue_conversation(self, user_message: str):
         """Continue an existing conversation with a new user message.
         
         This method allows for continuous multi-turn dialogue without creating a new agent.
         """
         self.continuous_mode = True
+        # Files may have changed between turns
+        self._tool_cache.clear()
         self.conversation.append({
             "role": "user",
             "content": user_message,
@@ -63,10 +63,13 @@ class ResearchContext(BaseModel):
     )
     
     working_directory: str = Field(default=".", description="Working directory for file operations")
+    history_archive: str | None = Field(
+        default=None, description="Compressed archive of messages dropped by conversation truncation"
+    )
 
     # ToDO: rename, my creativity finished now
     def agent_state(self) -> dict:
-        return self.model_dump(exclude={"searches", "sources", "clarification_received"})
+        return self.model_dump(exclude={"searches", "sources", "clarification_received", "history_archive"})
 
 
 class AgentStatistics(BaseModel):
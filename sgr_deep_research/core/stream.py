@@ -4,6 +4,9 @@ import time
 
 from openai.types.chat import ChatCompletionChunk
 
+# Placeholder serialized in place of the content value when pre-building the content chunk envelope
+CONTENT_PLACEHOLDER = "\x00content\x00"
+
 
 class StreamingGenerator:
     def __init__(self):
@@ -31,12 +34,17 @@ class OpenAIStreamingGenerator(StreamingGenerator):
         self.id = f"chatcmpl-{int(time.time())}{hash(str(time.time()))}"[:29]
         self.created = int(time.time())
         self.choice_index = 0
+        self._content_prefix, self._content_suffix = self._build_content_frame()
 
     def add_chunk(self, chunk: ChatCompletionChunk):
         chunk.model = self.model
         super().add(f"data: {chunk.model_dump_json()}\n\n")
 
     def add_chunk_from_str(self, content: str):
+        super().add(f"{self._content_prefix}{json.dumps(content)}{self._content_suffix}")
+
+    def _build_content_frame(self) -> tuple[str, str]:
+        """Serialize the constant content chunk envelope once, split around the content value."""
         response = {
             "id": self.id,
             "object": "chat.completion.chunk",
@@ -45,7 +53,7 @@ class OpenAIStreamingGenerator(StreamingGenerator):
             "system_fingerprint": self.fingerprint,
             "choices": [
                 {
-                    "delta": {"content": content, "role": "assistant", "tool_calls": None},
+                    "delta": {"content": CONTENT_PLACEHOLDER, "role": "assistant", "tool_calls": None},
                     "index": self.choice_index,
                     "finish_reason": None,
                     "logprobs": None,
@@ -53,7 +61,8 @@ class OpenAIStreamingGenerator(StreamingGenerator):
             ],
             "usage": None,
         }
-        super().add(f"data: {json.dumps(response)}\n\n")
+        prefix, suffix = f"data: {json.dumps(response)}\n\n".split(json.dumps(CONTENT_PLACEHOLDER))
+        return prefix, suffix
 
     def add_tool_call(self, tool_call_id: str, function_name: str, arguments: str):
         """Добавляет tool call chunk."""
@@ -62,7 +71,7 @@ class OpenAIStreamingGenerator(StreamingGenerator):
             "object": "chat.completion.chunk",
             "created": self.created,
             "model": self.model,
-            "system_fingerprint": f"fp_{hex(hash(self.model))[-8:]}",
+            "system_fingerprint": self.fingerprint,
             "choices": [
                 {
                     "delta": {
@@ -91,7 +100,7 @@ class OpenAIStreamingGenerator(StreamingGenerator):
             "object": "chat.completion.chunk",
             "created": self.created,
             "model": self.model,
-            "system_fingerprint": f"fp_{hex(hash(self.model))[-8:]}",
+            "system_fingerprint": self.fingerprint,
             "choices": [{"index": self.choice_index, "delta": {}, "logprobs": None, "finish_reason": finish_reason}],
             "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
         }
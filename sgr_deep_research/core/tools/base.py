@@ -25,6 +25,8 @@ class BaseTool(BaseModel):
 
     tool_name: ClassVar[str] = None
     description: ClassVar[str] = None
+    # Read-only tools whose result depends only on their arguments may be served from the agent's cache
+    cacheable: ClassVar[bool] = False
 
     async def __call__(self, context: ResearchContext) -> str:
         """Result should be a string or dumped json."""
@@ -1,14 +1,22 @@
 """Coding tools for repository operations using OS-level commands."""
 
 import asyncio
+import gzip
+import io
 import logging
 import os
 import subprocess
 from pathlib import Path
 from typing import TYPE_CHECKING, ClassVar
 
+import orjson
 from pydantic import Field
 
+try:
+    import zstandard
+except ImportError:  # optional, falls back to gzip
+    zstandard = None
+
 from sgr_deep_research.core.tools.base import BaseTool
 
 if TYPE_CHECKING:
@@ -16,6 +24,11 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# File suffix of the truncated conversation archive; zstd when available, gzip otherwise
+HISTORY_ARCHIVE_SUFFIX = ".msgs.zst" if zstandard is not None else ".msgs.gz"
+# Characters of each archived message content returned by RecallHistoryTool
+RECALL_CONTENT_CHARS = 2000
+
 
 class ReadFileTool(BaseTool):
     """Read file contents from the repository.
@@ -23,6 +36,8 @@ class ReadFileTool(BaseTool):
     Use this tool to read source code files, configuration files, or any text-based files.
     """
 
+    cacheable: ClassVar[bool] = True
+
     file_path: str = Field(description="Relative or absolute path to the file to read")
     start_line: int | None = Field(default=None, description="Optional starting line number (1-indexed)")
     end_line: int | None = Field(default=None, description="Optional ending line number (1-indexed)")
@@ -145,6 +160,8 @@ class GrepTool(BaseTool):
     Use this tool to find text patterns across files in the repository.
     """
 
+    cacheable: ClassVar[bool] = True
+
     pattern: str = Field(description="Search pattern (supports regex)")
     path: str = Field(default=".", description="Directory or file to search in")
     case_insensitive: bool = Field(default=False, description="Perform case-insensitive search")
@@ -268,6 +285,8 @@ class ListDirectoryTool(BaseTool):
     Automatically excludes common build/dependency directories like .venv, node_modules, .git, etc.
     """
 
+    cacheable: ClassVar[bool] = True
+
     path: str = Field(default=".", description="Directory path to list")
     recursive: bool = Field(default=False, description="List recursively")
     max_depth: int = Field(default=3, description="Maximum recursion depth (if recursive=True)")
@@ -379,6 +398,8 @@ class FindFilesTool(BaseTool):
     Use this tool to locate files matching a pattern.
     """
 
+    cacheable: ClassVar[bool] = True
+
     pattern: str = Field(description="File name pattern (supports wildcards like *.py)")
     path: str = Field(default=".", description="Directory to search in")
     max_results: int = Field(default=100, description="Maximum number of results")
@@ -424,6 +445,63 @@ class FindFilesTool(BaseTool):
             return f"Error finding files: {str(e)}"
 
 
+class RecallHistoryTool(BaseTool):
+    """Search earlier conversation messages that were dropped by history truncation.
+    
+    Use this tool to recall context (file contents, command output, decisions) that is no longer
+    visible in the conversation.
+    """
+
+    query: str = Field(description="Case-insensitive text to search for in archived messages")
+    max_results: int = Field(default=10, description="Maximum number of messages to return (most recent first)")
+
+    @staticmethod
+    def archive(path: str, messages: list[dict]) -> None:
+        """Append messages to the archive as one compressed frame of JSON lines."""
+        data = b"".join(orjson.dumps(message, default=str) + b"\n" for message in messages)
+        data = zstandard.ZstdCompressor(level=3).compress(data) if zstandard is not None else gzip.compress(data)
+        with open(path, "ab") as f:
+            f.write(data)
+
+    @staticmethod
+    def _read_archive(path: str) -> bytes:
+        with open(path, "rb") as f:
+            data = f.read()
+        if zstandard is not None:
+            return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True).read()
+        return gzip.decompress(data)
+
+    async def __call__(self, context: "ResearchContext") -> str:
+        try:
+            path = context.history_archive
+            if not path or not os.path.exists(path):
+                return "No archived conversation history yet"
+            
+            lines = (await asyncio.to_thread(self._read_archive, path)).splitlines()
+            query = self.query.lower()
+            
+            matches = []
+            for line in reversed(lines):
+                message = orjson.loads(line)
+                content = str(message.get("content") or message.get("tool_calls") or "")
+                if query in content.lower():
+                    if len(content) > RECALL_CONTENT_CHARS:
+                        content = content[:RECALL_CONTENT_CHARS] + "..."
+                    matches.append(f"[{message.get('role')}] {content}")
+                    if len(matches) >= self.max_results:
+                        break
+            
+            if not matches:
+                return f"No archived messages found for: {self.query}"
+            
+            result = "\n\n".join(matches)
+            return f"Archived messages matching '{self.query}':\n\n{result}"
+            
+        except Exception as e:
+            logger.error(f"Error recalling history: {e}")
+            return f"Error recalling history: {str(e)}"
+
+
 # Import web search tools for internet search capability
 from sgr_deep_research.core.tools.research import WebSearchTool, ExtractPageContentTool
 
@@ -436,6 +514,7 @@ coding_agent_tools = [
     RunCommandTool,
     ListDirectoryTool,
     FindFilesTool,
+    RecallHistoryTool,
     WebSearchTool,
     ExtractPageContentTool,
 ]
@@ -0,0 +1,31 @@
+import httpx
+import pytest
+
+import cli
+
+
+def mock_client(monkeypatch: pytest.MonkeyPatch, *payloads: str) -> None:
+    body = "".join(f"data: {payload}\n\n" for payload in payloads)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text=body))
+    monkeypatch.setattr(cli, "client", httpx.Client(base_url="http://test/v1", transport=transport))
+
+
+def test_iter_sse_chunks_stops_at_done_and_skips_malformed_payloads(monkeypatch):
+    mock_client(monkeypatch, '{"choices": []}', "not json", '{"id": "2"}', "[DONE]", '{"id": "3"}')
+
+    assert list(cli.iter_sse_chunks(b"{}")) == [{"choices": []}, {"id": "2"}]
+
+
+@pytest.mark.parametrize("error", ['{"message": "agent crashed", "type": "server_error"}', '"agent crashed"'])
+def test_iter_sse_chunks_raises_error_payload(monkeypatch, error):
+    mock_client(monkeypatch, '{"choices": []}', f'{{"error": {error}}}')
+
+    chunks = cli.iter_sse_chunks(b"{}")
+    assert next(chunks) == {"choices": []}
+    with pytest.raises(cli.StreamError, match="agent crashed"):
+        next(chunks)
+
+
+def test_client_has_finite_timeouts():
+    assert cli.client.timeout.connect is not None
+    assert cli.client.timeout.read is not None
@@ -0,0 +1,88 @@
+import pytest
+
+from cli_stream import CHAR_STYLES, CONTEXT_STYLES, DIGIT_STYLE, LEX_DEFAULT, LEX_STRING, JSONLexer, lex_json_native
+
+SAMPLE = (
+    '{"file_path": "src/app.py", "content": "print(\\"hi\\")\\n{not: [json]}\\\\", '
+    '"lines": [1, -2.5e3, 40], "enabled": true, "meta": {"note": "ünïcode ✓", "empty": null}}\n'
+)
+
+
+def char_styles(spans):
+    """Flatten spans to per-character styles, so differently split outputs compare equal."""
+    return [(char, style) for text, style in spans for char in text]
+
+
+def lex_in_chunks(text: str, size: int):
+    lexer = JSONLexer()
+    spans = []
+    for start in range(0, len(text), size):
+        spans.extend(lexer.feed(text[start : start + size]))
+    return lexer, spans
+
+
+def test_feed_covers_input_in_order():
+    _, spans = lex_in_chunks(SAMPLE, len(SAMPLE))
+
+    assert "".join(text for text, _ in spans) == SAMPLE
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 64])
+def test_feed_is_independent_of_chunk_split(size):
+    whole_lexer, whole = lex_in_chunks(SAMPLE, len(SAMPLE))
+    split_lexer, split = lex_in_chunks(SAMPLE, size)
+
+    assert char_styles(split) == char_styles(whole)
+    assert (split_lexer.state, split_lexer.depth) == (whole_lexer.state, whole_lexer.depth)
+
+
+def test_keys_values_and_numbers_are_styled_by_context():
+    styles = dict(JSONLexer().feed('{"key": "value", "n": 42}'))
+
+    assert styles["key"] == CONTEXT_STYLES["key"]
+    assert styles["value"] == CONTEXT_STYLES["string"]
+    assert styles["42"] == DIGIT_STYLE
+
+
+def test_depth_ignores_brackets_inside_strings():
+    lexer = JSONLexer()
+    lexer.feed('{"a": [1, {"b": "}]{["')
+
+    assert lexer.depth == 3
+    assert lexer.state == LEX_DEFAULT
+
+    lexer.feed(', "c')
+    assert lexer.state == LEX_STRING
+
+
+def test_escaped_quote_split_across_chunks_stays_in_string():
+    lexer = JSONLexer()
+    spans = lexer.feed('{"a": "x\\') + lexer.feed('"y"}')
+
+    assert lexer.state == LEX_DEFAULT
+    assert lexer.depth == 0
+    assert ('"y', CONTEXT_STYLES["string"]) in spans
+
+
+def test_escaped_backslash_split_across_chunks_closes_string():
+    lexer = JSONLexer()
+    spans = lexer.feed('{"a": "x\\') + lexer.feed('\\"}')
+
+    assert lexer.state == LEX_DEFAULT
+    assert lexer.depth == 0
+    assert spans[-2:] == [('"', CHAR_STYLES['"']), ("}", CHAR_STYLES["}"])]
+
+
+@pytest.mark.parametrize("size", [1, 5, len(SAMPLE)])
+def test_native_lexer_matches_python(size):
+    if lex_json_native is None:
+        pytest.importorskip("numba")
+
+    python_lexer, python_spans = lex_in_chunks(SAMPLE, size)
+    native_lexer = JSONLexer()
+    native_spans = []
+    for start in range(0, len(SAMPLE), size):
+        native_spans.extend(native_lexer._feed_native(SAMPLE[start : start + size]))
+
+    assert char_styles(native_spans) == char_styles(python_spans)
+    assert (native_lexer.state, native_lexer.depth) == (python_lexer.state, python_lexer.depth)
@@ -0,0 +1,25 @@
+from cli_stream import JSONStreamPrinter, RenderQueue
+
+
+def test_next_tool_printer_stops_previous_live():
+    output = RenderQueue(immediate=True)
+    first = JSONStreamPrinter(output)
+    second = JSONStreamPrinter(output)
+
+    first.print_tool_header("readfiletool")
+    first_live = output.live
+    first.stream_chunk('{"file_path": "README.md"')
+    second.print_tool_header("greptool")
+
+    assert not first_live.is_started
+    assert output.live is not None and output.live.is_started
+    assert output.live is not first_live
+
+    # The superseded printer neither stops the new view nor writes into it
+    first.stream_chunk("}")
+    first.close()
+    assert output.live is not None and output.live.is_started
+    assert "}" not in second._live_text.plain
+
+    second.finalize_tool()
+    assert output.live is None
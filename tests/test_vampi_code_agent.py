@@ -0,0 +1,160 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from sgr_deep_research.core.agents import base_agent as base_agent_module
+from sgr_deep_research.core.agents import sgr_vampi_code_agent as vampi_agent_module
+from sgr_deep_research.core.agents.sgr_vampi_code_agent import REASONING_TOOL_CHOICE, SGRVampiCodeAgent
+from sgr_deep_research.core.models import AgentStatesEnum
+from sgr_deep_research.core.tools import FinalAnswerTool, ReasoningTool
+from sgr_deep_research.core.tools.coding import ReadFileTool
+
+
+def make_reasoning() -> ReasoningTool:
+    return ReasoningTool(
+        reasoning_steps=["The file content is needed", "Read it first"],
+        current_situation="Nothing has been read yet",
+        plan_status="Reading the file",
+        remaining_steps=["Read README.md"],
+        task_completed=False,
+    )
+
+
+def make_tool_call(tool):
+    function = SimpleNamespace(name=tool.tool_name, arguments=tool.model_dump_json(), parsed_arguments=tool)
+    return SimpleNamespace(function=function)
+
+
+def make_completion(*tool_calls, content=None):
+    message = SimpleNamespace(tool_calls=list(tool_calls) or None, content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeStream:
+    """Chat completion stream without chunks, returning a prepared completion or raising an error."""
+
+    def __init__(self, result):
+        self._result = result
+
+    async def __aenter__(self):
+        if isinstance(self._result, Exception):
+            raise self._result
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+    async def get_final_completion(self):
+        return self._result
+
+
+class FakeCompletions:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls: list[dict] = []
+
+    def stream(self, **kwargs):
+        self.calls.append(kwargs)
+        return FakeStream(self.results.pop(0))
+
+
+@pytest.fixture()
+def make_agent(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    for module in (base_agent_module, vampi_agent_module):
+        monkeypatch.setattr(module.config.execution, "logs_dir", str(tmp_path / "logs"))
+
+    def _make(*results):
+        agent = SGRVampiCodeAgent(task="Read README.md", working_directory=str(tmp_path))
+        completions = FakeCompletions(*results)
+        agent.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        agent._context.iteration = 1
+        return agent, completions
+
+    return _make
+
+
+def recorded_tool_names(agent: SGRVampiCodeAgent) -> list[str]:
+    return [msg["tool_calls"][0]["function"]["name"] for msg in agent.conversation if msg.get("tool_calls")]
+
+
+def test_combined_call_records_reasoning_before_action(make_agent):
+    reasoning, action = make_reasoning(), ReadFileTool(file_path="README.md")
+    agent, completions = make_agent(make_completion(make_tool_call(action), make_tool_call(reasoning)))
+
+    result = asyncio.run(agent._reason_and_act())
+
+    assert result == (reasoning, action)
+    assert len(completions.calls) == 1
+    assert completions.calls[0]["parallel_tool_calls"] is True
+    assert recorded_tool_names(agent) == [ReasoningTool.tool_name, ReadFileTool.tool_name]
+
+
+def test_action_only_forces_reasoning_and_keeps_action(make_agent):
+    reasoning, action = make_reasoning(), ReadFileTool(file_path="README.md")
+    agent, completions = make_agent(
+        make_completion(make_tool_call(action)),
+        make_completion(make_tool_call(reasoning)),
+    )
+
+    result = asyncio.run(agent._reason_and_act())
+
+    assert result == (reasoning, action)
+    assert len(completions.calls) == 2
+    assert completions.calls[1]["tool_choice"] == REASONING_TOOL_CHOICE
+    assert recorded_tool_names(agent) == [ReasoningTool.tool_name, ReadFileTool.tool_name]
+
+
+def test_rejected_combined_call_switches_to_two_phases(make_agent):
+    reasoning, action = make_reasoning(), ReadFileTool(file_path="README.md")
+    agent, completions = make_agent(
+        RuntimeError("parallel_tool_calls is not supported"),
+        make_completion(make_tool_call(reasoning)),
+        make_completion(make_tool_call(action)),
+        make_completion(make_tool_call(reasoning)),
+        make_completion(make_tool_call(action)),
+    )
+
+    asyncio.run(agent._reason_and_act())
+    agent._context.iteration += 1
+    result = asyncio.run(agent._reason_and_act())
+
+    assert result == (reasoning, action)
+    assert agent.combined_calls is False
+    assert len(completions.calls) == 5
+    assert [call["tool_choice"] == REASONING_TOOL_CHOICE for call in completions.calls[1:]] == [
+        True,
+        False,
+        True,
+        False,
+    ]
+    assert all("parallel_tool_calls" not in call for call in completions.calls[1:])
+    assert recorded_tool_names(agent) == [ReasoningTool.tool_name, ReadFileTool.tool_name] * 2
+
+
+def test_text_reply_falls_back_to_final_answer(make_agent):
+    agent, _ = make_agent(make_completion(content="All done"))
+
+    tool = asyncio.run(agent._select_action_phase(make_reasoning()))
+
+    assert isinstance(tool, FinalAnswerTool)
+    assert tool.answer == "All done"
+    assert tool.completed_steps == ["All done"]
+    assert tool.status == AgentStatesEnum.COMPLETED
+    assert recorded_tool_names(agent) == [FinalAnswerTool.tool_name]
+
+
+def test_tool_generation_error_falls_back_to_final_answer(make_agent):
+    agent, _ = make_agent(RuntimeError("invalid tool arguments"))
+
+    tool = asyncio.run(agent._select_action_phase(make_reasoning()))
+
+    assert isinstance(tool, FinalAnswerTool)
+    assert tool.status == AgentStatesEnum.ERROR
+    assert "invalid tool arguments" in tool.answer